@@ -1,59 +1,233 @@
-from flask import Flask, request, make_response
+from flask import Flask, request, make_response, abort
+from flask.json.provider import JSONProvider
 from flask_migrate import Migrate
 from flask_login import LoginManager
-from flask_restful import Resource, Api, reqparse
-from models import db, User, Student, Teacher, Class, Subject, ScoreGrade, FeeStructure, FeePayment, PickupLocation
-from datetime import datetime, timedelta
+from flask_restful import Resource, Api
+from models import db, bcrypt, User, Student, Teacher, Class, Subject, Test, ScoreGrade, FeeStructure, FeePayment, PickupLocation, MonthlyEnrollment, SubjectScoreCount, month_of
+from datetime import date
 from flask_cors import CORS
-from auth import Register, Login, Logout, ProtectedResource
-from flask_session import Session
-from sqlalchemy import func
+from auth import Register, Login, Logout, ProtectedResource, user_from_token
+from serializers import build_class_tree
+import repository
+from schemas import fee_payment_decoder, fee_payments_decoder, score_grade_decoder, score_grades_decoder
+from sqlalchemy import func, select, case, event, insert, update, delete, text, inspect, literal_column
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import func
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import Session, object_session, joinedload, contains_eager, selectinload, raiseload, lazyload, undefer_group, load_only
+from cachelib import SimpleCache
+from functools import wraps
+from collections import Counter
+from bisect import bisect_right
+import msgspec
+import sqlite3
+import os
+
+
+class MsgspecJSONProvider(JSONProvider):
+    """Flask JSON provider backed by msgspec's C encoder/decoder, which also handles dates natively."""
+
+    encoder = msgspec.json.Encoder()
+
+    def dumps(self, obj, **kwargs):
+        return self.encoder.encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        try:
+            return msgspec.json.decode(s)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e  # Flask turns ValueError into a 400
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encoder.encode(obj), mimetype="application/json")
 
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = MsgspecJSONProvider(app)
 
 
 # Configurations
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///school.db'  
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config["SESSION_TYPE"] = "filesystem"  # Store sessions in files on the server
-app.config["SESSION_PERMANENT"] = False
-app.config["SESSION_USE_SIGNER"] = True  # Sign cookies to prevent tampering
-app.config["SESSION_KEY_PREFIX"] = "auth_"  # Prefix to avoid conflicts
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    "pool_size": 10,
+    "connect_args": {"check_same_thread": False},  # Pooled connections are shared across request threads
+}
+# Sessions use Flask's built-in signed cookie: the login state is a user id, so there is no
+# server-side session store to read, write and lock on every request
 app.config["SECRET_KEY"] = "your-secure-secret-key"  # Replace with a strong, unique key
-
-# Initialize session
-Session(app)
+# bcrypt cost factor for new password hashes; each step down halves login hashing time.
+# Existing hashes keep the cost they were created with
+app.config["BCRYPT_LOG_ROUNDS"] = int(os.environ.get("BCRYPT_LOG_ROUNDS", 12))
 
 # Initialize extensions
 db.init_app(app)
+bcrypt.init_app(app)
 migrate = Migrate(app, db)
 api = Api(app)
 login_manager = LoginManager(app)
 login_manager.login_view = "login"
-CORS(app, resources={r"/*": {"origins": "*"}})
+# Restrict CORS to the frontend origins (comma-separated CORS_ORIGINS) and let browsers
+# reuse a preflight for a day instead of sending OPTIONS before every request
+app.config["CORS_ORIGINS"] = os.environ["CORS_ORIGINS"].split(",") if os.environ.get("CORS_ORIGINS") else "*"
+CORS(app, resources={r"/*": {"origins": app.config["CORS_ORIGINS"], "max_age": 86400}})
+
+
+@api.representation("application/json")
+def output_json(data, code, headers=None):
+    """Encode Flask-RESTful resource results with msgspec instead of the stdlib json module."""
+    return app.response_class(
+        MsgspecJSONProvider.encoder.encode(data), status=code, headers=headers, mimetype="application/json"
+    )
+
+# In-process cache for aggregates that are expensive to recompute on every request
+cache = SimpleCache(default_timeout=60)
+
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune every new SQLite connection: WAL lets readers run alongside a writer instead of blocking on
+    the rollback journal, and synchronous=NORMAL keeps a WAL database consistent while skipping the
+    fsync on every commit (only a power loss can drop the last few commits).
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # Read pages through a 256 MiB memory map instead of read() calls
+    cursor.close()
 
 
 # Flask-Login user loader
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return db.session.get(User, int(user_id))
+
+@login_manager.request_loader
+def load_user_from_request(request):
+    """Authenticate an ``Authorization: Bearer <token>`` header from the token alone, with no user query."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return user_from_token(token)
+    return None
+
+@app.cli.command("db-init")
+def db_init():
+    """
+    Create any missing tables, columns and indexes, then rebuild the derived data (run once per
+    deploy, not on every worker start). create_all() only creates whole tables, so columns and
+    indexes added to existing tables since are created here.
+    """
+    db.create_all()
+    with db.engine.begin() as connection:
+        student_columns = {column["name"] for column in inspect(connection).get_columns("students")}
+        if "total_paid" not in student_columns:
+            connection.execute(text("ALTER TABLE students ADD COLUMN total_paid FLOAT NOT NULL DEFAULT 0"))
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))  # Reflection can't see expression indexes
+    Student.rebuild_total_paid()
+    MonthlyEnrollment.rebuild()
+    SubjectScoreCount.rebuild()
+    db.session.commit()
+
+
+# Parses "YYYY-MM-DD" request values; the C-level ISO parser is far cheaper than strptime
+parse_date = date.fromisoformat
+
+
+def keyset_paginate(query, key, cursor, per_page, descending=False):
+    """
+    Return one page of rows after ``cursor`` on ``key`` plus the cursor for the next page.
+
+    Seeks with ``WHERE key > cursor`` (``<`` when ``descending``) on an indexed column instead of
+    OFFSET, and fetches one extra row to know whether another page exists, so no COUNT(*) is needed.
+    """
+    if cursor:
+        query = query.filter(key < cursor if descending else key > cursor)
+    rows = query.order_by(key.desc() if descending else key).limit(per_page + 1).all()
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        return rows, rows[-1].id
+    return rows, None
+
+
+def deferred_page_ids(id_query, key, page, per_page):
+    """
+    Return a subquery of the ids on ``page`` for a deferred join.
+
+    LIMIT/OFFSET runs over the bare indexed ``key`` only, so skipped rows are never joined or
+    materialised; the caller joins the wide columns for the surviving ``per_page`` ids.
+    """
+    if page < 1 or per_page < 1:
+        abort(404)
+    return id_query.order_by(key).limit(per_page).offset((page - 1) * per_page).subquery()
+
+
+def cached_count(key, count):
+    """
+    Return the total for a paginated list, recomputing it via ``count()`` at most once a minute.
+
+    Keeps the COUNT(*) scan off the per-page request path; writes that change a total delete its key.
+    """
+    total = cache.get(key)
+    if total is None:
+        total = count()
+        cache.set(key, total)
+    return total
+
+
+def cached_response(key, timeout=60):
+    """Serve a resource method's successful ``(body, status)`` result from the cache for ``timeout`` seconds."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            result = cache.get(key)
+            if result is None:
+                result = method(*args, **kwargs)
+                if result[1] == 200:
+                    cache.set(key, result, timeout=timeout)
+            return result
+        return wrapper
+    return decorator
+
+
+def page_envelope(total, page, per_page):
+    """Pagination metadata matching Flask-SQLAlchemy's ``paginate()`` fields."""
+    return {
+        "total": total,
+        "pages": -(-total // per_page),
+        "current_page": page,
+    }
 
-with app.app_context():
-    db.create_all()  
 #=================================================================================================
 # Student endpoints
 #=================================================================================================
 class StudentListResource(Resource):
+    # Response keys, in the order of the columns selected in get()
+    ROW_KEYS = (
+        "id", "name", "date_of_birth", "gender", "date_of_admission",
+        "class_id", "class_name", "nemis_no", "assessment_no", "pickup_location_id",
+    )
+
+    @staticmethod
+    def serialize_row(student):
+        return dict(zip(StudentListResource.ROW_KEYS, student))
+
     def get(self):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
-        
+        cursor = request.args.get('cursor', type=int)
+
         # Perform the join to include class_name
-        students = (
+        query = (
             db.session.query(
                 Student.id,
                 Student.name,
@@ -67,29 +241,27 @@ class StudentListResource(Resource):
                 Student.pickup_location_id
             )
             .join(Class, Student.class_id == Class.id)  # Join on class_id
-            .paginate(page=page, per_page=per_page)
         )
 
+        # Keyset pagination: pass cursor=0 for the first page, then the returned next_cursor
+        if cursor is not None:
+            students, next_cursor = keyset_paginate(query, Student.id, cursor, per_page)
+            return {
+                "students": [self.serialize_row(student) for student in students],
+                "next_cursor": next_cursor,
+            }, 200
+
+        # Deferred join: page over Student.id alone, then join Class for just this page
+        page_ids = deferred_page_ids(db.session.query(Student.id), Student.id, page, per_page)
+        students = query.join(page_ids, Student.id == page_ids.c.id).order_by(Student.id).all()
+        if not students and page > 1:
+            abort(404)
+        total = cached_count("count:students", db.session.query(func.count(Student.id)).scalar)
+
         # Construct the response
         return {
-            "students": [
-                {
-                    "id": student.id,
-                    "name": student.name,
-                    "date_of_birth": student.date_of_birth.strftime("%Y-%m-%d"),
-                    "gender": student.gender,
-                    "date_of_admission": student.date_of_admission.strftime("%Y-%m-%d"),
-                    "class_id": student.class_id,
-                    "class_name": student.class_name,  # Include class_name in response
-                    "nemis_no": student.nemis_no,
-                    "assessment_no": student.assessment_no,
-                    "pickup_location_id": student.pickup_location_id,
-                }
-                for student in students.items
-            ],
-            "total": students.total,
-            "pages": students.pages,
-            "current_page": students.page,
+            "students": [self.serialize_row(student) for student in students],
+            **page_envelope(total, page, per_page),
         }, 200
 
 
@@ -99,15 +271,16 @@ class StudentListResource(Resource):
         try:
             new_student = Student(
                 name=data["name"],
-                date_of_birth=datetime.strptime(data["date_of_birth"], "%Y-%m-%d").date(),  # Convert to date
+                date_of_birth=parse_date(data["date_of_birth"]),  # Convert to date
                 gender=data["gender"],
-                date_of_admission=datetime.strptime(data["date_of_admission"], "%Y-%m-%d").date(),  # Convert to date
+                date_of_admission=parse_date(data["date_of_admission"]),  # Convert to date
                 class_id=data["class_id"],
                 nemis_no=data["nemis_no"],
                 assessment_no=data["assessment_no"]
             )
             db.session.add(new_student)
             db.session.commit()
+            cache.delete("count:students")
             return new_student.serialize(), 201
         except Exception as e:
             db.session.rollback()
@@ -116,14 +289,15 @@ class StudentListResource(Resource):
 class StudentResource(Resource):
     def get(self, student_id):
         """Retrieve a single student by ID."""
-        student = Student.query.get(student_id)
+        student = db.session.get(Student, student_id)
         if not student:
             return {"message": "Student not found"}, 404
         return student.serialize(), 200
 
     def put(self, student_id):
         """Update an existing student."""
-        student = Student.query.get(student_id)
+        # Skip the eager collection load: the commit expires it before the response reads it
+        student = db.session.get(Student, student_id, with_for_update=True, options=[lazyload(Student.scores)])
         if not student:
             return {"message": "Student not found"}, 404
 
@@ -131,10 +305,10 @@ class StudentResource(Resource):
         try:
             student.name = data.get("name", student.name)
             if "date_of_birth" in data:
-                student.date_of_birth = datetime.strptime(data["date_of_birth"], "%Y-%m-%d").date()
+                student.date_of_birth = parse_date(data["date_of_birth"])
             student.gender = data.get("gender", student.gender)
             if "date_of_admission" in data:
-                student.date_of_admission = datetime.strptime(data["date_of_admission"], "%Y-%m-%d").date()
+                student.date_of_admission = parse_date(data["date_of_admission"])
             student.class_id = data.get("class_id", student.class_id)
             student.nemis_no = data.get("nemis_no", student.nemis_no)
             student.assessment_no = data.get("assessment_no", student.assessment_no)
@@ -148,19 +322,54 @@ class StudentResource(Resource):
 
     def delete(self, student_id):
         """Delete a student."""
-        student = Student.query.get(student_id)
+        student = db.session.get(Student, student_id, with_for_update=True)
         if not student:
             return {"message": "Student not found"}, 404
         try:
             db.session.delete(student)
             db.session.commit()
+            cache.delete("count:students")
             return {"message": "Student deleted successfully"}, 200
         except Exception as e:
             db.session.rollback()
             return {"message": f"Error deleting student: {str(e)}"}, 400
 
 
+
+class StudentBulkResource(Resource):
+    def post(self):
+        """Create many students from a JSON array in one batched INSERT and a single commit."""
+        data = request.json
+        if not isinstance(data, list):
+            return {"message": "Expected a JSON array of students"}, 400
+        try:
+            rows = [
+                {
+                    "name": item["name"],
+                    "date_of_birth": parse_date(item["date_of_birth"]),
+                    "gender": item["gender"],
+                    "date_of_admission": parse_date(item["date_of_admission"]),
+                    "class_id": item["class_id"],
+                    "nemis_no": item["nemis_no"],
+                    "assessment_no": item["assessment_no"],
+                    "pickup_location_id": item.get("pickup_location_id"),
+                }
+                for item in data
+            ]
+            db.session.bulk_insert_mappings(Student, rows)
+            MonthlyEnrollment.adjust(
+                db.session.connection(), Counter(month_of(row["date_of_admission"]) for row in rows)
+            )
+            db.session.commit()
+            cache.delete_many("count:students", "dashboard:summary")  # Bulk inserts skip mapper events
+            return {"message": f"{len(rows)} students created", "count": len(rows)}, 201
+        except Exception as e:
+            db.session.rollback()
+            return {"message": f"Error creating students: {str(e)}"}, 400
+
+
 api.add_resource(StudentListResource, "/students")
+api.add_resource(StudentBulkResource, "/students/bulk")
 api.add_resource(StudentResource, "/students/<int:student_id>")
 
 #=================================================================================================
@@ -172,20 +381,57 @@ class TeacherListResource(Resource):
         """Retrieve a paginated list of teachers with their associated subjects."""
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        cursor = request.args.get('cursor', type=int)
         search = request.args.get('search', '', type=str)
 
         query = Teacher.query
 
         # Add search filter if search query is provided
+        # SQLite's LIKE is already case-insensitive for ASCII, so a single LIKE over the full name
+        # replaces two ILIKEs and their per-row lower() calls
         if search:
             search_term = f"%{search}%"
-            query = query.filter(
-                (Teacher.first_name.ilike(search_term)) | 
-                (Teacher.last_name.ilike(search_term))
+            query = query.filter((Teacher.first_name + " " + Teacher.last_name).like(search_term))
+
+        # Keyset pagination: pass cursor=0 for the first page, then the returned next_cursor
+        if cursor is not None:
+            # Subjects and classes come from one IN query each, keeping the page query to teacher rows
+            teachers, next_cursor = keyset_paginate(
+                query.options(
+                    selectinload(Teacher.subject),
+                    selectinload(Teacher.classes),
+                    raiseload('*', sql_only=True),
+                ),
+                Teacher.id, cursor, per_page
             )
+            return {
+                "teachers": [
+                    {
+                        **teacher.serialize(),
+                        "subject_name": teacher.subject.subject_name if teacher.subject else None,
+                    }
+                    for teacher in teachers
+                ],
+                "next_cursor": next_cursor,
+            }, 200
 
-        # Use joinedload for eager loading subject data
-        teachers = query.options(joinedload(Teacher.subject)).paginate(page=page, per_page=per_page)
+        # Deferred join: the search filter and OFFSET run over Teacher.id only, and subjects are
+        # fetched by primary key for the surviving page of teachers
+        page_ids = deferred_page_ids(query.with_entities(Teacher.id), Teacher.id, page, per_page)
+        teachers = (
+            Teacher.query.join(page_ids, Teacher.id == page_ids.c.id)
+            .options(
+                selectinload(Teacher.subject),
+                selectinload(Teacher.classes),
+                raiseload('*', sql_only=True),
+            )
+            .order_by(Teacher.id)
+            .all()
+        )
+        if not teachers and page > 1:
+            abort(404)
+        # Only the unfiltered total is cached; a searched total depends on text the writes can't enumerate
+        total = query.count() if search else cached_count("count:teachers", query.count)
 
         return {
             "teachers": [
@@ -193,11 +439,9 @@ class TeacherListResource(Resource):
                     **teacher.serialize(),
                     "subject_name": teacher.subject.subject_name if teacher.subject else None,
                 }
-                for teacher in teachers.items
+                for teacher in teachers
             ],
-            "total": teachers.total,
-            "pages": teachers.pages,
-            "current_page": teachers.page,
+            **page_envelope(total, page, per_page),
         }, 200
 
     def post(self):
@@ -207,11 +451,12 @@ class TeacherListResource(Resource):
             new_teacher = Teacher(
                 first_name=data["first_name"],
                 last_name=data["last_name"],
-                date_of_admission=datetime.strptime(data["date_of_admission"], "%Y-%m-%d").date(),
+                date_of_admission=parse_date(data["date_of_admission"]),
                 subject_id=data.get("subject_id"),  # Associate with subject if provided
             )
             db.session.add(new_teacher)
             db.session.commit()
+            cache.delete("count:teachers")
             return {
                 **new_teacher.serialize(),
                 "subject_name": new_teacher.subject.subject_name if new_teacher.subject else None,
@@ -224,7 +469,7 @@ class TeacherListResource(Resource):
 class TeacherResource(Resource):
     def get(self, teacher_id):
         """Retrieve a single teacher by ID with associated subject."""
-        teacher = Teacher.query.options(joinedload(Teacher.subject)).get(teacher_id)
+        teacher = db.session.get(Teacher, teacher_id)  # Teacher.subject is joined-loaded by default
         if not teacher:
             return {"message": "Teacher not found"}, 404
         return {
@@ -234,7 +479,8 @@ class TeacherResource(Resource):
 
     def put(self, teacher_id):
         """Update an existing teacher."""
-        teacher = Teacher.query.get(teacher_id)
+        # Skip the eager collection load: the commit expires it before the response reads it
+        teacher = db.session.get(Teacher, teacher_id, with_for_update=True, options=[lazyload(Teacher.classes)])
         if not teacher:
             return {"message": "Teacher not found"}, 404
 
@@ -242,10 +488,8 @@ class TeacherResource(Resource):
         try:
             teacher.first_name = data.get("first_name", teacher.first_name)
             teacher.last_name = data.get("last_name", teacher.last_name)
-            teacher.date_of_admission = datetime.strptime(
-                data.get("date_of_admission", teacher.date_of_admission.strftime('%Y-%m-%d')), 
-                '%Y-%m-%d'
-            ).date()
+            if "date_of_admission" in data:
+                teacher.date_of_admission = parse_date(data["date_of_admission"])
             teacher.subject_id = data.get("subject_id", teacher.subject_id)
 
             db.session.commit()
@@ -259,20 +503,48 @@ class TeacherResource(Resource):
 
     def delete(self, teacher_id):
         """Delete a teacher."""
-        teacher = Teacher.query.get(teacher_id)
+        teacher = db.session.get(Teacher, teacher_id, with_for_update=True)
         if not teacher:
             return {"message": "Teacher not found"}, 404
         try:
             db.session.delete(teacher)
             db.session.commit()
+            # The delete cascades to the teacher's classes and their students
+            cache.delete_many("count:teachers", "count:classes", "count:students")
             return {"message": "Teacher deleted successfully"}, 200
         except Exception as e:
             db.session.rollback()
             return {"message": f"Error deleting teacher: {str(e)}"}, 400
 
 
+class TeacherBulkResource(Resource):
+    def post(self):
+        """Create many teachers from a JSON array in one batched INSERT and a single commit."""
+        data = request.json
+        if not isinstance(data, list):
+            return {"message": "Expected a JSON array of teachers"}, 400
+        try:
+            rows = [
+                {
+                    "first_name": item["first_name"],
+                    "last_name": item["last_name"],
+                    "date_of_admission": parse_date(item["date_of_admission"]),
+                    "subject_id": item.get("subject_id"),
+                }
+                for item in data
+            ]
+            db.session.bulk_insert_mappings(Teacher, rows)
+            db.session.commit()
+            cache.delete_many("count:teachers", "dashboard:summary")  # Bulk inserts skip mapper events
+            return {"message": f"{len(rows)} teachers created", "count": len(rows)}, 201
+        except Exception as e:
+            db.session.rollback()
+            return {"message": f"Error creating teachers: {str(e)}"}, 400
+
+
 # Add resource endpoints to the API
 api.add_resource(TeacherListResource, "/teachers")
+api.add_resource(TeacherBulkResource, "/teachers/bulk")
 api.add_resource(TeacherResource, "/teachers/<int:teacher_id>")
 
 #=================================================================================================
@@ -281,9 +553,35 @@ api.add_resource(TeacherResource, "/teachers/<int:teacher_id>")
 
 class ClassListResource(Resource):
     def get(self):
-        """Retrieve all classes."""
-        classes = Class.query.all()
-        response_body = [class_.serialize() for class_ in classes]
+        """
+        Retrieve all classes, or one page of them when ``page`` is given. ``nested=1`` embeds each
+        class's teacher and students (with scores), as GET /classes/<id> does.
+        """
+        # Flat rows with SQL-side student counts; raiseload makes any relationship access fail loudly
+        query = Class.query.options(undefer_group("counts"), raiseload('*', sql_only=True))
+        page = request.args.get('page', type=int)
+        nested = request.args.get('nested', 0, type=int)
+        if page is None:
+            if nested:
+                return make_response(build_class_tree(select(Class.id)), 200)
+            response_body = [class_.serialize() for class_ in query.all()]
+            return make_response(response_body, 200)
+
+        per_page = request.args.get('per_page', 10, type=int)
+        if page < 1 or per_page < 1:
+            abort(404)
+        classes = query.order_by(Class.id).limit(per_page).offset((page - 1) * per_page).all()
+        if not classes and page > 1:
+            abort(404)
+        total = cached_count("count:classes", db.session.query(func.count(Class.id)).scalar)
+        response_body = {
+            "classes": (
+                build_class_tree([class_.id for class_ in classes])
+                if nested
+                else [class_.serialize() for class_ in classes]
+            ),
+            **page_envelope(total, page, per_page),
+        }
         return make_response(response_body, 200)
 
     def post(self):
@@ -296,6 +594,7 @@ class ClassListResource(Resource):
         try:
             db.session.add(new_class)
             db.session.commit()
+            cache.delete("count:classes")
             response_body = {
                 "message": "Class created successfully!",
                 "class": new_class.serialize()
@@ -309,13 +608,15 @@ class ClassListResource(Resource):
 class ClassResource(Resource):
     def get(self, class_id):
         """Retrieve a specific class by ID."""
-        class_ = Class.query.get_or_404(class_id)
-        response_body = class_.serialize()
+        class_ = Class.get_with_children(class_id)
+        if class_ is None:
+            abort(404)
+        response_body = class_.serialize_deep()
         return make_response(response_body, 200)
 
     def put(self, class_id):
         """Update class details."""
-        class_ = Class.query.get_or_404(class_id)
+        class_ = db.get_or_404(Class, class_id, with_for_update=True)
         data = request.get_json()
         try:
             class_.class_name = data.get('class_name', class_.class_name)
@@ -332,10 +633,11 @@ class ClassResource(Resource):
 
     def delete(self, class_id):
         """Delete a class."""
-        class_ = Class.query.get_or_404(class_id)
+        class_ = db.get_or_404(Class, class_id, with_for_update=True)
         try:
             db.session.delete(class_)
             db.session.commit()
+            cache.delete_many("count:classes", "count:students")  # The delete cascades to the class's students
             response_body = {"message": "Class deleted successfully!"}
             return make_response(response_body, 200)
         except Exception as e:
@@ -343,18 +645,50 @@ class ClassResource(Resource):
             return make_response({"error": str(e)}, 400)
 
 
+class ClassOptionsResource(Resource):
+    def get(self):
+        """Id and name of every class, for dropdowns; only those two columns are loaded."""
+        classes = Class.query.options(load_only(Class.id, Class.class_name), raiseload('*')).order_by(Class.class_name)
+        return [{"id": class_.id, "class_name": class_.class_name} for class_ in classes], 200
+
+
+class ClassBalanceResource(Resource):
+    def get(self, class_id):
+        """Fee balances of every student in a class, computed in a single query."""
+        if class_fee_total(class_id) is None:
+            return {"message": "Fee structure not found for the class."}, 404
+        return {"class_id": class_id, "balances": repository.balances_for_class(class_id)}, 200
+
+
 # Registering resources
 api.add_resource(ClassListResource, '/classes')  # /classes for listing and creating
+api.add_resource(ClassOptionsResource, '/classes/options')  # /classes/options for dropdowns
 api.add_resource(ClassResource, '/classes/<int:class_id>')  # /classes/<id> for specific operations
+api.add_resource(ClassBalanceResource, "/classes/<int:class_id>/balances")
 
 #=================================================================================================
 # Subject endpoints
 #=================================================================================================
 class SubjectListResource(Resource):
     def get(self):
-        """Retrieve all subjects."""
-        subjects = Subject.query.all()
-        return [subject.serialize() for subject in subjects], 200
+        """Retrieve all subjects, or one page of them when ``page`` is given (GET /subjects/<id> nests the children)."""
+        # Flat rows with SQL-side counts; raiseload makes any relationship access fail loudly
+        query = Subject.query.options(undefer_group("counts"), raiseload('*', sql_only=True))
+        page = request.args.get('page', type=int)
+        if page is None:
+            return [subject.serialize() for subject in query.all()], 200
+
+        per_page = request.args.get('per_page', 10, type=int)
+        if page < 1 or per_page < 1:
+            abort(404)
+        subjects = query.order_by(Subject.id).limit(per_page).offset((page - 1) * per_page).all()
+        if not subjects and page > 1:
+            abort(404)
+        total = cached_count("count:subjects", db.session.query(func.count(Subject.id)).scalar)
+        return {
+            "subjects": [subject.serialize() for subject in subjects],
+            **page_envelope(total, page, per_page),
+        }, 200
 
     def post(self):
         """Create a new subject."""
@@ -365,6 +699,7 @@ class SubjectListResource(Resource):
             )
             db.session.add(new_subject)
             db.session.commit()
+            cache.delete("count:subjects")
             return new_subject.serialize(), 201
         except Exception as e:
             db.session.rollback()
@@ -374,14 +709,14 @@ class SubjectListResource(Resource):
 class SubjectResource(Resource):
     def get(self, subject_id):
         """Retrieve a single subject by ID."""
-        subject = Subject.query.get(subject_id)
-        if not subject:
+        subjects = Subject.serialize_bulk([subject_id])
+        if not subjects:
             return {"message": "Subject not found"}, 404
-        return subject.serialize(), 200
+        return subjects[0], 200
 
     def put(self, subject_id):
         """Update an existing subject."""
-        subject = Subject.query.get(subject_id)
+        subject = db.session.get(Subject, subject_id, with_for_update=True)
         if not subject:
             return {"message": "Subject not found"}, 404
 
@@ -396,18 +731,39 @@ class SubjectResource(Resource):
 
     def delete(self, subject_id):
         """Delete a subject."""
-        subject = Subject.query.get(subject_id)
+        subject = db.session.get(Subject, subject_id, with_for_update=True)
         if not subject:
             return {"message": "Subject not found"}, 404
         try:
             db.session.delete(subject)
             db.session.commit()
+            # The delete cascades to the subject's teachers, their classes and those classes' students
+            cache.delete_many("count:subjects", "count:teachers", "count:classes", "count:students")
             return {"message": "Subject deleted successfully"}, 200
         except Exception as e:
             db.session.rollback()
             return {"message": f"Error deleting subject: {str(e)}"}, 400
 
+
+class SubjectBulkResource(Resource):
+    def post(self):
+        """Create many subjects from a JSON array in one batched INSERT and a single commit."""
+        data = request.json
+        if not isinstance(data, list):
+            return {"message": "Expected a JSON array of subjects"}, 400
+        try:
+            rows = [{"subject_name": item["subject_name"]} for item in data]
+            db.session.bulk_insert_mappings(Subject, rows)
+            db.session.commit()
+            cache.delete_many("count:subjects", "dashboard:summary")  # Bulk inserts skip mapper events
+            return {"message": f"{len(rows)} subjects created", "count": len(rows)}, 201
+        except Exception as e:
+            db.session.rollback()
+            return {"message": f"Error creating subjects: {str(e)}"}, 400
+
+
 api.add_resource(SubjectListResource, "/subjects")
+api.add_resource(SubjectBulkResource, "/subjects/bulk")
 api.add_resource(SubjectResource, "/subjects/<int:subject_id>")
 
 #=================================================================================================
@@ -415,36 +771,24 @@ api.add_resource(SubjectResource, "/subjects/<int:subject_id>")
 #=================================================================================================
 
 class ScoreGradeResource(Resource):
-    parser = reqparse.RequestParser()
-    parser.add_argument('student_id', type=int, required=True, help="Student ID is required")
-    parser.add_argument('subject_id', type=int, required=True, help="Subject ID is required")
-    parser.add_argument('test_id', type=int, required=False, help="Test ID is optional")
-    parser.add_argument('score', type=float, required=False, help="Score is optional")
-    parser.add_argument('max_score', type=float, default=100.0, help="Maximum score")
-    parser.add_argument('term', type=str, required=False, help="Term is optional")
-    parser.add_argument('year', type=int, required=False, help="Year is optional")
+    @staticmethod
+    def parse_args():
+        """Decode and type-check the JSON body in one msgspec pass; raises msgspec.DecodeError."""
+        return msgspec.structs.asdict(score_grade_decoder.decode(request.get_data()))
 
     def get(self, score_grade_id):
-        score_grade = db.session.query(
-            ScoreGrade,
-            Student.name.label("student_name"),
-            Subject.subject_name.label("subject_name")
-        ).join(
-            Student, ScoreGrade.student_id == Student.id
-        ).join(
-            Subject, ScoreGrade.subject_id == Subject.id
-        ).filter(ScoreGrade.id == score_grade_id).first()
-
+        # Join just the two name columns in; the student's own score collection is not needed
+        score_grade = db.session.get(ScoreGrade, score_grade_id, options=[
+            joinedload(ScoreGrade.student).options(load_only(Student.name), lazyload(Student.scores)),
+            joinedload(ScoreGrade.subject).load_only(Subject.subject_name),
+        ])
         if not score_grade:
             return {"message": "ScoreGrade not found"}, 404
 
-        sg_data = score_grade.ScoreGrade.serialize()
-        sg_data["student_name"] = score_grade.student_name
-        sg_data["subject_name"] = score_grade.subject_name
-        return sg_data, 200
+        return score_grade.serialize_full(), 200
 
     def delete(self, score_grade_id):
-        score_grade = ScoreGrade.query.get(score_grade_id)
+        score_grade = db.session.get(ScoreGrade, score_grade_id)
         if not score_grade:
             return {"message": "ScoreGrade not found"}, 404
 
@@ -453,11 +797,14 @@ class ScoreGradeResource(Resource):
         return {"message": "ScoreGrade deleted successfully"}, 200
 
     def put(self, score_grade_id):
-        score_grade = ScoreGrade.query.get(score_grade_id)
+        score_grade = db.session.get(ScoreGrade, score_grade_id)
         if not score_grade:
             return {"message": "ScoreGrade not found"}, 404
 
-        data = ScoreGradeResource.parser.parse_args()
+        try:
+            data = ScoreGradeResource.parse_args()
+        except msgspec.DecodeError as e:
+            return {"message": str(e)}, 400
         score_grade.student_id = data['student_id']
         score_grade.subject_id = data['subject_id']
         score_grade.test_id = data['test_id']
@@ -471,46 +818,92 @@ class ScoreGradeResource(Resource):
 
 
 class ScoreGradeListResource(Resource):
+    MAX_PER_PAGE = 500  # Upper bound on one page, however large per_page is requested
+
+    @staticmethod
+    def serialize_row(sg):
+        return {
+            "id": sg.id,
+            "student_id": sg.student_id,
+            "subject_id": sg.subject_id,
+            "test_id": sg.test_id,
+            "score": sg.score,
+            "max_score": sg.max_score,
+            "term": sg.term,
+            "year": sg.year,
+            "student_name": sg.student_name,
+            "subject_name": sg.subject_name,
+        }
+
     def get(self):
-        score_grades = db.session.query(
-            ScoreGrade,
+        per_page = min(request.args.get('per_page', 50, type=int), self.MAX_PER_PAGE)
+        cursor = request.args.get('cursor', 0, type=int)
+        if per_page < 1:
+            abort(404)
+
+        # Project only the returned columns and seek on ScoreGrade.id instead of loading the table
+        query = db.session.query(
+            ScoreGrade.id,
+            ScoreGrade.student_id,
+            ScoreGrade.subject_id,
+            ScoreGrade.test_id,
+            ScoreGrade.score,
+            ScoreGrade.max_score,
+            ScoreGrade.term,
+            ScoreGrade.year,
             Student.name.label("student_name"),
             Subject.subject_name.label("subject_name")
         ).join(
             Student, ScoreGrade.student_id == Student.id
         ).join(
             Subject, ScoreGrade.subject_id == Subject.id
-        ).all()
-
-        results = []
-        for sg, student_name, subject_name in score_grades:
-            sg_data = sg.serialize()
-            sg_data["student_name"] = student_name
-            sg_data["subject_name"] = subject_name
-            results.append(sg_data)
+        )
+        score_grades, next_cursor = keyset_paginate(query, ScoreGrade.id, cursor, per_page)
 
-        return results, 200
+        return {
+            "score_grades": [self.serialize_row(sg) for sg in score_grades],
+            "next_cursor": next_cursor,
+        }, 200
 
     def post(self):
-        data = ScoreGradeResource.parser.parse_args()
-
-        # Create a new ScoreGrade object
-        score_grade = ScoreGrade(
-            student_id=data['student_id'],
-            subject_id=data['subject_id'],
-            test_id=data['test_id'],
-            score=data['score'],
-            max_score=data['max_score'],
-            term=data['term'],
-            year=data['year']
-        )
+        """Create one score grade, or many from a JSON array (e.g. a term-end import)."""
+        try:
+            data = score_grades_decoder.decode(request.get_data())
+        except msgspec.DecodeError as e:
+            return {"message": str(e)}, 400
+        if isinstance(data, list):
+            return self.create_many([msgspec.structs.asdict(item) for item in data])
 
+        score_grade = ScoreGrade(**msgspec.structs.asdict(data))
         db.session.add(score_grade)
         db.session.commit()
         return score_grade.serialize(), 201
 
+    @staticmethod
+    def create_many(rows):
+        """Insert all rows in one batched INSERT and a single commit."""
+        try:
+            db.session.bulk_insert_mappings(ScoreGrade, rows)
+            # Bulk inserts skip mapper events, so count the new scores per subject here
+            SubjectScoreCount.adjust(
+                db.session.connection(), Counter(row["subject_id"] for row in rows)
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {"message": f"Error creating score grades: {str(e)}"}, 400
+        return {"message": f"{len(rows)} score grades created", "count": len(rows)}, 201
+
+
+class TestOptionsResource(Resource):
+    def get(self):
+        """Id and name of every test, for the score entry picker; only those two columns are loaded."""
+        tests = Test.query.options(load_only(Test.id, Test.name), raiseload('*')).order_by(Test.id)
+        return [{"id": test.id, "name": test.name} for test in tests], 200
+
 
 # Add Resources to API
+api.add_resource(TestOptionsResource, '/tests/options')
 api.add_resource(ScoreGradeListResource, '/score_grades')
 api.add_resource(ScoreGradeResource, '/score_grades/<int:score_grade_id>')
 
@@ -518,11 +911,26 @@ api.add_resource(ScoreGradeResource, '/score_grades/<int:score_grade_id>')
 # Report endpoints
 #=================================================================================================
 
+# Lower percentage bound of each grade band above "E", ascending, aligned with _GRADES[1:]
+_GRADE_THRESHOLDS = [30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80]
+_GRADES = ["E", "D-", "D", "D+", "C-", "C", "C+", "B-", "B", "B+", "A-", "A"]
+
 class StudentReportResource(Resource):
     def get(self, student_id, term, year):
-        # Fetch scores for the specific student, term, and year
+        # Percentage per score, NULL when it can't be graded (no score or no positive max_score)
+        percentage = case(
+            (ScoreGrade.score.isnot(None) & (ScoreGrade.max_score > 0),
+             ScoreGrade.score * 100.0 / ScoreGrade.max_score),
+        )
+
+        # Fetch scores for the specific student, term, and year; the database computes each
+        # percentage and, as a window aggregate, the average over the same rows
         scores = db.session.query(
-            ScoreGrade, Subject.subject_name
+            Subject.subject_name,
+            ScoreGrade.score,
+            ScoreGrade.max_score,
+            percentage.label("percentage"),
+            func.avg(percentage).over().label("average_percentage"),
         ).join(
             Subject, ScoreGrade.subject_id == Subject.id
         ).filter(
@@ -535,29 +943,18 @@ class StudentReportResource(Resource):
             return {"message": "No scores found for the specified criteria"}, 404
 
         # Prepare the report data
-        report = []
-        total_percentage = 0
-        count = 0
-
-        for score_grade, subject_name in scores:
-            # Dynamically calculate grade based on score and max_score
-            grade = None
-            if score_grade.score is not None and score_grade.max_score > 0:
-                percentage = (score_grade.score / score_grade.max_score) * 100
-                grade = self.calculate_grade(percentage)
-                total_percentage += percentage
-                count += 1
-
-            report.append({
-                "subject_name": subject_name,
-                "score": score_grade.score,
-                "max_score": score_grade.max_score,
-                "grade": grade
-            })
-
-        # Calculate the average percentage and grade
-        average_percentage = total_percentage / count if count > 0 else None
-        average_grade = self.calculate_grade(average_percentage) if average_percentage is not None else None
+        report = [
+            {
+                "subject_name": row.subject_name,
+                "score": row.score,
+                "max_score": row.max_score,
+                "grade": self.calculate_grade(row.percentage),
+            }
+            for row in scores
+        ]
+
+        average_percentage = scores[0].average_percentage
+        average_grade = self.calculate_grade(average_percentage)
 
         return {
             "student_id": student_id,
@@ -570,33 +967,10 @@ class StudentReportResource(Resource):
 
     @staticmethod
     def calculate_grade(percentage):
-    
         if percentage is None:
             return None
-        if percentage >= 80:
-            return "A"
-        elif percentage >= 75:
-            return "A-"
-        elif percentage >= 70:
-            return "B+"
-        elif percentage >= 65:
-            return "B"
-        elif percentage >= 60:
-            return "B-"
-        elif percentage >= 55:
-            return "C+"
-        elif percentage >= 50:
-            return "C"
-        elif percentage >= 45:
-            return "C-"
-        elif percentage >= 40:
-            return "D+"
-        elif percentage >= 35:
-            return "D"
-        elif percentage >= 30:
-            return "D-"
-        else:
-            return "E"
+        # Binary search over the band thresholds instead of an if/elif ladder
+        return _GRADES[bisect_right(_GRADE_THRESHOLDS, percentage)]
 
 api.add_resource(StudentReportResource, '/report/<int:student_id>/<string:term>/<int:year>')
 
@@ -604,13 +978,44 @@ api.add_resource(StudentReportResource, '/report/<int:student_id>/<string:term>/
 # Dashboard endpoints
 #=================================================================================================
 
+def flag_dashboard_summary(mapper, connection, target):
+    """Note that a counted row was inserted or deleted; the cached counts are dropped once it commits."""
+    object_session(target).info["dashboard_summary_stale"] = True
+
+
+for _model in (Student, Teacher, Class, Subject):
+    event.listen(_model, "after_insert", flag_dashboard_summary)
+    event.listen(_model, "after_delete", flag_dashboard_summary)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_dashboard_summary(session):
+    """
+    Drop the cached dashboard counts after a commit that changed them. Deleting at flush time instead
+    would let a concurrent request re-cache the old counts before the new rows became visible.
+    """
+    if session.info.pop("dashboard_summary_stale", False):
+        cache.delete("dashboard:summary")
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_dashboard_summary_flag(session):
+    session.info.pop("dashboard_summary_stale", None)
+
+
 class DashboardSummaryResource(Resource):
+    @cached_response("dashboard:summary")
     def get(self):
         """Retrieve summary data for the dashboard."""
-        total_students = Student.query.count()
-        total_teachers = Teacher.query.count()
-        total_classes = Class.query.count()
-        total_subjects = Subject.query.count()
+        # One SELECT of four scalar COUNT subqueries instead of four round-trips
+        total_students, total_teachers, total_classes, total_subjects = db.session.execute(
+            select(
+                select(func.count(Student.id)).scalar_subquery(),
+                select(func.count(Teacher.id)).scalar_subquery(),
+                select(func.count(Class.id)).scalar_subquery(),
+                select(func.count(Subject.id)).scalar_subquery(),
+            )
+        ).one()
         return {
             "total_students": total_students,
             "total_teachers": total_teachers,
@@ -622,35 +1027,30 @@ class DashboardSummaryResource(Resource):
 class DashboardNotificationsResource(Resource):
     def get(self):
         """Retrieve recently admitted students as notifications."""
-        recent_students = (
-            Student.query.order_by(Student.date_of_admission.desc())
+        # Select just the three returned columns; msgspec encodes the dates as ISO strings
+        recent_students = db.session.execute(
+            select(Student.id, Student.name, Student.date_of_admission)
+            .order_by(Student.date_of_admission.desc())
             .limit(5)
-            .all()
-        )
+        ).all()
         return [
-            {
-                "id": student.id,
-                "name": student.name,
-                "date_of_admission": student.date_of_admission.strftime("%Y-%m-%d"),
-            }
-            for student in recent_students
+            {"id": id_, "name": name, "date_of_admission": date_of_admission}
+            for id_, name, date_of_admission in recent_students
         ], 200
 
 
 class DashboardEnrollmentChartResource(Resource):
+    @cached_response("dashboard:enrollment")
     def get(self):
         """Retrieve enrollment data grouped by month for the past year."""
-        current_date = datetime.utcnow()
-        one_year_ago = current_date - timedelta(days=365)
+        # The cutoff month is computed by SQLite itself, in the same 'YYYY-MM' form as the rollup key
+        one_year_ago = func.strftime("%Y-%m", "now", "-365 days")
 
+        # Read the maintained monthly rollup (a primary key range) instead of grouping all students
         data = (
-            Student.query.with_entities(
-                func.strftime('%Y-%m', Student.date_of_admission).label('month'),
-                func.count().label('count'),
-            )
-            .filter(Student.date_of_admission >= one_year_ago)
-            .group_by(func.strftime('%Y-%m', Student.date_of_admission))
-            .order_by('month')
+            db.session.query(MonthlyEnrollment.month, MonthlyEnrollment.count)
+            .filter(MonthlyEnrollment.month >= one_year_ago, MonthlyEnrollment.count > 0)
+            .order_by(MonthlyEnrollment.month)
             .all()
         )
 
@@ -659,16 +1059,15 @@ class DashboardEnrollmentChartResource(Resource):
 
 
 class DashboardSubjectPopularityChartResource(Resource):
+    @cached_response("dashboard:subject-popularity")
     def get(self):
         """Retrieve data for subject popularity."""
+        # Read the maintained per-subject rollup (one row per subject) instead of grouping all score grades
         data = (
-            ScoreGrade.query.with_entities(
-                Subject.subject_name,
-                func.count(ScoreGrade.student_id).label('count'),
-            )
-            .join(Subject, Subject.id == ScoreGrade.subject_id)
-            .group_by(Subject.subject_name)
-            .order_by(func.count(ScoreGrade.student_id).desc())
+            db.session.query(Subject.subject_name, SubjectScoreCount.count)
+            .join(SubjectScoreCount, SubjectScoreCount.subject_id == Subject.id)
+            .filter(SubjectScoreCount.count > 0)
+            .order_by(SubjectScoreCount.count.desc())
             .all()
         )
 
@@ -676,17 +1075,25 @@ class DashboardSubjectPopularityChartResource(Resource):
         return chart_data, 200
 
 
+# The quick links never change, so encode them once at import instead of on every request
+QUICK_LINKS_JSON = MsgspecJSONProvider.encoder.encode({
+    "quick_links": [
+        {"name": "Manage Students", "url": "/students", "icon": "student-icon"},
+        {"name": "Manage Teachers", "url": "/teachers", "icon": "teacher-icon"},
+        {"name": "Manage Classes", "url": "/classes", "icon": "class-icon"},
+        {"name": "View Reports", "url": "/reports", "icon": "report-icon"},
+    ]
+})
+
+
 class DashboardQuickLinksResource(Resource):
     def get(self):
         """Retrieve quick links metadata."""
-        return {
-            "quick_links": [
-                {"name": "Manage Students", "url": "/students", "icon": "student-icon"},
-                {"name": "Manage Teachers", "url": "/teachers", "icon": "teacher-icon"},
-                {"name": "Manage Classes", "url": "/classes", "icon": "class-icon"},
-                {"name": "View Reports", "url": "/reports", "icon": "report-icon"},
-            ]
-        }, 200
+        return app.response_class(
+            QUICK_LINKS_JSON,
+            mimetype="application/json",
+            headers={"Cache-Control": "public, max-age=3600"},
+        )
 
 
 api.add_resource(DashboardSummaryResource, "/dashboard/summary")
@@ -712,33 +1119,30 @@ from flask_restful import Resource
 from sqlalchemy.orm import joinedload
 from models import FeeStructure, Class, db
 
-class FeeStructureResource(Resource):
-    @staticmethod
-    def calculate_total_fee(data):
-        return sum([
-            float(data.get("tuition_fee", 0.0)),
-            float(data.get("books_fee", 0.0)),
-            float(data.get("miscellaneous_fee", 0.0)),
-            float(data.get("boarding_fee", 0.0)),
-            float(data.get("prize_giving_fee", 0.0)),
-            float(data.get("exam_fee", 0.0)),
-        ])
+def is_duplicate_class_fee_structure(error):
+    """Whether an IntegrityError is the one-fee-structure-per-class index (ix_fs_class_id_unique)."""
+    message = str(error.orig)
+    # SQLite names the indexed column, PostgreSQL the index itself
+    return "UNIQUE constraint failed: fee_structures.class_id" in message or "ix_fs_class_id_unique" in message
 
+
+class FeeStructureResource(Resource):
     def get(self, fee_structure_id=None):
         if fee_structure_id:
             fee_structure = (
-                FeeStructure.query.options(
-                    joinedload(FeeStructure.class_)
-                )
-                .filter_by(id=fee_structure_id)
+                FeeStructure.query.outerjoin(FeeStructure.class_)
+                .options(contains_eager(FeeStructure.class_))
+                .filter(FeeStructure.id == fee_structure_id)
                 .first()
             )
             if not fee_structure:
                 return make_response({"message": "Fee structure not found"}, 404)
             return make_response(fee_structure.serialize_with_class(), 200)
 
-        fee_structures = FeeStructure.query.options(
-            joinedload(FeeStructure.class_)
+        # One explicit JOIN fills both sides; the outer join keeps structures whose class is gone
+        fee_structures = FeeStructure.query.outerjoin(FeeStructure.class_).options(
+            contains_eager(FeeStructure.class_),
+            raiseload('*', sql_only=True),
         ).all()
         return make_response(
             [fee_structure.serialize_with_class() for fee_structure in fee_structures], 200
@@ -746,33 +1150,47 @@ class FeeStructureResource(Resource):
 
     def post(self):
         data = request.get_json()
-    
-        total_fee = self.calculate_total_fee(data)
-
-        fee_structure = FeeStructure(
-            class_id=data.get("class_id"),
-            tuition_fee=float(data.get("tuition_fee", 0.0)),
-            books_fee=float(data.get("books_fee", 0.0)),
-            miscellaneous_fee=float(data.get("miscellaneous_fee", 0.0)),
-            boarding_fee=float(data.get("boarding_fee", 0.0)),
-            prize_giving_fee=float(data.get("prize_giving_fee", 0.0)),
-            exam_fee=float(data.get("exam_fee", 0.0)),
-            total_fee=total_fee,
-        )
 
-        db.session.add(fee_structure)
+        class_id = data.get("class_id")
+        if class_id is None:
+            return make_response({"message": "class_id is required"}, 400)
+        fees = {field: float(data.get(field, 0.0)) for field in FeeStructure.FEE_FIELDS}
+        total_fee = FeeStructure.total_of(fees.values())  # Core inserts skip the flush hook
+
+        # INSERT ... RETURNING id, then answer from the values already in hand instead of
+        # flushing an ORM object and refreshing it after commit
+        try:
+            fee_structure_id = db.session.execute(
+                insert(FeeStructure)
+                .values(class_id=class_id, total_fee=total_fee, **fees)
+                .returning(FeeStructure.id)
+            ).scalar_one()
+        except IntegrityError as e:
+            db.session.rollback()
+            if is_duplicate_class_fee_structure(e):
+                return make_response({"message": "A fee structure already exists for this class"}, 400)
+            return make_response({"message": f"Error saving fee structure: {str(e.orig)}"}, 400)
+        class_ = db.session.get(Class, class_id)
+        fee_structure = {
+            "id": fee_structure_id,
+            "class_id": class_id,
+            "class_details": {"id": class_.id, "class_name": class_.class_name} if class_ else None,
+            **fees,
+            "total_fee": total_fee,
+        }
         db.session.commit()
-        return make_response(
-        {"message": "Fee structure created", "fee_structure": fee_structure.serialize_with_class()}, 201
-    )
+        return make_response({"message": "Fee structure created", "fee_structure": fee_structure}, 201)
 
     def put(self, fee_structure_id):
-        fee_structure = FeeStructure.query.get(fee_structure_id)
+        fee_structure = db.session.get(FeeStructure, fee_structure_id)
         if not fee_structure:
             return make_response({"message": "Fee structure not found"}, 404)
 
         data = request.get_json()
 
+        if "class_id" in data and data["class_id"] is None:
+            return make_response({"message": "class_id cannot be null"}, 400)
+
         # Update fields
         fee_structure.class_id = data.get("class_id", fee_structure.class_id)
         fee_structure.tuition_fee = data.get("tuition_fee", fee_structure.tuition_fee)
@@ -782,28 +1200,25 @@ class FeeStructureResource(Resource):
         fee_structure.prize_giving_fee = data.get("prize_giving_fee", fee_structure.prize_giving_fee)
         fee_structure.exam_fee = data.get("exam_fee", fee_structure.exam_fee)
 
-        # Recalculate total fee after updates
-        updated_data = {
-            "tuition_fee": fee_structure.tuition_fee,
-            "books_fee": fee_structure.books_fee,
-            "miscellaneous_fee": fee_structure.miscellaneous_fee,
-            "boarding_fee": fee_structure.boarding_fee,
-            "prize_giving_fee": fee_structure.prize_giving_fee,
-            "exam_fee": fee_structure.exam_fee,
-        }
-        fee_structure.total_fee = self.calculate_total_fee(updated_data)
-
-        db.session.commit()
+        try:
+            db.session.commit()  # total_fee is recalculated on flush
+        except IntegrityError as e:
+            db.session.rollback()
+            if is_duplicate_class_fee_structure(e):
+                return make_response({"message": "A fee structure already exists for this class"}, 400)
+            return make_response({"message": f"Error saving fee structure: {str(e.orig)}"}, 400)
         return make_response(
             {"message": "Fee structure updated", "fee_structure": fee_structure.serialize_with_class()}, 200
         )
 
     def delete(self, fee_structure_id):
-        fee_structure = FeeStructure.query.get(fee_structure_id)
-        if not fee_structure:
+        # Nothing references a fee structure, so delete it without loading it first
+        deleted_id = db.session.execute(
+            delete(FeeStructure).where(FeeStructure.id == fee_structure_id).returning(FeeStructure.id),
+            execution_options={"synchronize_session": False},
+        ).scalar_one_or_none()
+        if deleted_id is None:
             return make_response({"message": "Fee structure not found"}, 404)
-
-        db.session.delete(fee_structure)
         db.session.commit()
         return make_response({"message": "Fee structure deleted"}, 200)
 
@@ -817,12 +1232,12 @@ api.add_resource(FeeStructureResource, "/fee-structure", "/fee-structure/<int:fe
 class PickupLocationResource(Resource):
     def get(self, location_id=None):
         if location_id:
-            location = PickupLocation.query.get(location_id)
+            location = db.session.get(PickupLocation, location_id)
             if not location:
                 return {"message": "Pickup location not found"}, 404
             return location.serialize(), 200
 
-        locations = PickupLocation.query.all()
+        locations = PickupLocation.query.options(raiseload('*', sql_only=True)).all()
         return [location.serialize() for location in locations], 200
 
     def post(self):
@@ -836,20 +1251,32 @@ class PickupLocationResource(Resource):
         return {"message": "Pickup location created", "location": location.serialize()}, 201
 
     def put(self, location_id):
-        location = PickupLocation.query.get(location_id)
+        data = request.get_json()
+        values = {field: data[field] for field in ("location_name", "transport_fee") if field in data}
+        if not values:
+            location = db.session.get(PickupLocation, location_id)
+        else:
+            # UPDATE ... RETURNING writes and reads the row back in a single statement
+            location = db.session.scalars(
+                update(PickupLocation)
+                .where(PickupLocation.id == location_id)
+                .values(**values)
+                .returning(PickupLocation)
+            ).one_or_none()
         if not location:
             return {"message": "Pickup location not found"}, 404
-        data = request.get_json()
-        location.location_name = data.get("location_name", location.location_name)
-        location.transport_fee = data.get("transport_fee", location.transport_fee)
         db.session.commit()
         return {"message": "Pickup location updated", "location": location.serialize()}, 200
 
     def delete(self, location_id):
-        location = PickupLocation.query.get(location_id)
-        if not location:
+        # Detach students from the location (what the ORM delete did) and delete it, without loading either
+        Student.query.filter_by(pickup_location_id=location_id).update(
+            {Student.pickup_location_id: None}, synchronize_session=False
+        )
+        rows = PickupLocation.query.filter_by(id=location_id).delete(synchronize_session=False)
+        if not rows:
+            db.session.rollback()
             return {"message": "Pickup location not found"}, 404
-        db.session.delete(location)
         db.session.commit()
         return {"message": "Pickup location deleted"}, 200
 
@@ -863,73 +1290,103 @@ api.add_resource(PickupLocationResource, "/pickup-location", "/pickup-location/<
 from flask import request
 from flask_restful import Resource
 from sqlalchemy import func
-from datetime import datetime
 from models import db, FeePayment, FeeStructure, PickupLocation, Student
 
 
+def class_fee_total(class_id):
+    """Return the total fee of a class's fee structure, or None if it has none."""
+    return db.session.query(FeeStructure.total_fee).filter_by(class_id=class_id).scalar()
+
+
 class FeePaymentResource(Resource):
 
-    def calculate_grand_total(self, student):
+    @staticmethod
+    def add_to_total_paid(student_id, delta):
+        """
+        Add ``delta`` to a student's running total_paid in the current transaction.
+
+        Returns the updated ``(total_paid, class_id, pickup_location_id, class_fee_total,
+        transport_fee)`` row, or None if the student does not exist. The class fee total and
+        transport fee are read by the same statement rather than cached, since they end up stored
+        in FeePayment.balance and must not be stale.
+        """
+        # RETURNING renders columns without their table name, which would turn the correlation into
+        # "class_id = class_id" inside the subquery, so the outer references are spelled out
+        return db.session.execute(
+            update(Student)
+            .where(Student.id == student_id)
+            .values(total_paid=Student.total_paid + delta)
+            .returning(
+                Student.total_paid,
+                Student.class_id,
+                Student.pickup_location_id,
+                select(FeeStructure.total_fee)
+                .where(FeeStructure.class_id == literal_column("students.class_id"))
+                .scalar_subquery()
+                .label("class_fee_total"),
+                select(PickupLocation.transport_fee)
+                .where(PickupLocation.id == literal_column("students.pickup_location_id"))
+                .scalar_subquery()
+                .label("transport_fee"),
+            ),
+            execution_options={"synchronize_session": False},
+        ).one_or_none()
+
+    @staticmethod
+    def calculate_grand_total(student):
         """
         Calculate the grand total for a student, including transport fee if applicable.
         """
-        # Get the student's fee structure
-        fee_structure = FeeStructure.query.filter_by(class_id=student.class_id).first()
-        if not fee_structure:
+        # Base fees from the student's class fee structure
+        grand_total = student.class_fee_total
+        if grand_total is None:
             raise ValueError("Fee structure not found for the student's class.")
 
-        # Base fees
-        grand_total = (
-            fee_structure.tuition_fee +
-            fee_structure.books_fee +
-            fee_structure.miscellaneous_fee +
-            fee_structure.boarding_fee +
-            fee_structure.prize_giving_fee +
-            fee_structure.exam_fee
-        )
-
         # Add transport fee if a pickup location is assigned
         if student.pickup_location_id:
-            pickup_location = PickupLocation.query.get(student.pickup_location_id)
-            if pickup_location:
-                grand_total += pickup_location.transport_fee
+            grand_total += student.transport_fee or 0.0
 
         return grand_total
 
-    def calculate_balance(self, student, new_payment_amount):
+    def calculate_balance(self, student):
         """
-        Calculate the remaining balance after a payment is made.
+        Calculate the remaining balance from the student's running total paid.
         """
-        # Get the grand total
-        grand_total = self.calculate_grand_total(student)
-
-        # Total amount paid so far
-        total_paid = db.session.query(func.sum(FeePayment.amount)).filter_by(student_id=student.id).scalar() or 0
+        return self.calculate_grand_total(student) - student.total_paid
 
-        # Include the new payment
-        new_total_paid = float(total_paid) + float(new_payment_amount)
-
-        # Calculate the balance
-        return grand_total - new_total_paid
+    @staticmethod
+    def serialize_with_names(fee_payments):
+        """Serialize a page of payments, naming each student from one id -> name lookup for the page."""
+        student_ids = {payment.student_id for payment in fee_payments}
+        names = dict(
+            db.session.execute(select(Student.id, Student.name).where(Student.id.in_(student_ids))).all()
+        ) if student_ids else {}
+        return [
+            {**payment.serialize(), "student_name": names.get(payment.student_id)}
+            for payment in fee_payments
+        ]
 
     def get(self, fee_payment_id=None):
         if fee_payment_id:
             # Fetch a specific fee payment by ID
-            fee_payment = FeePayment.query.get(fee_payment_id)
+            fee_payment = db.session.get(FeePayment, fee_payment_id, options=[
+                joinedload(FeePayment.student).options(load_only(Student.name), lazyload(Student.scores)),
+            ])
             if not fee_payment:
                 return {"message": "Fee payment not found"}, 404
 
-            # Serialize the fee payment
-            return fee_payment.serialize(), 200
+            # The detail view names the student; list pages stay on the plain serialize()
+            return fee_payment.serialize_full(), 200
 
         # Pagination and filtering logic
         page = request.args.get('page', type=int, default=1)
         per_page = request.args.get('per_page', type=int, default=10)
+        cursor = request.args.get('cursor', type=int)
         student_id = request.args.get('student_id', type=int)
         term = request.args.get('term')
         year = request.args.get('year', type=int)
 
-        query = FeePayment.query
+        query = FeePayment.query.options(raiseload('*', sql_only=True))
         if student_id:
             query = query.filter(FeePayment.student_id == student_id)
         if term:
@@ -937,11 +1394,19 @@ class FeePaymentResource(Resource):
         if year:
             query = query.filter(FeePayment.year == year)
 
+        # Keyset pagination, newest first: pass cursor=0 for the first page, then the returned next_cursor
+        if cursor is not None:
+            fee_payments, next_cursor = keyset_paginate(query, FeePayment.id, cursor, per_page, descending=True)
+            return {
+                "fee_payments": self.serialize_with_names(fee_payments),
+                "next_cursor": next_cursor,
+            }, 200
+
         # Paginate the results
         fee_payments = query.paginate(page=page, per_page=per_page, error_out=False)
 
         # Serialize all fee payment records
-        payments_with_balance = [payment.serialize() for payment in fee_payments.items]
+        payments_with_balance = self.serialize_with_names(fee_payments.items)
 
         # Return the response
         return {
@@ -952,76 +1417,77 @@ class FeePaymentResource(Resource):
         }, 200
 
     def post(self):
-        data = request.get_json()
+        # Decode and type-check the body in one pass; payment_date arrives as a date
+        try:
+            payment = fee_payment_decoder.decode(request.get_data())
+        except msgspec.DecodeError as e:
+            return {"message": str(e)}, 400
 
-        # Validate Student
-        student = Student.query.get(data.get("student_id"))
+        # Validate Student and add the new payment to their total paid
+        student = self.add_to_total_paid(payment.student_id, payment.amount)
         if not student:
             return {"message": "Student not found"}, 404
 
         try:
             # Calculate balance after the new payment
-            balance = self.calculate_balance(student, data["amount"])
+            balance = self.calculate_balance(student)
         except ValueError as e:
+            db.session.rollback()
             return {"message": str(e)}, 400
 
-        # Create the FeePayment record
-        fee_payment = FeePayment(
-            student_id=student.id,
-            amount=data["amount"],
-            payment_date=datetime.strptime(data["payment_date"], "%Y-%m-%d").date(),
-            term=data.get("term"),
-            year=data.get("year"),
-            method=data.get("method"),
-            balance=balance
-        )
-
-        db.session.add(fee_payment)
+        # Create the FeePayment record with INSERT ... RETURNING id; the response is built from the
+        # inserted values, so nothing is flushed through the ORM or refreshed after commit
+        values = {**msgspec.structs.asdict(payment), "balance": balance}
+        fee_payment_id = db.session.execute(
+            insert(FeePayment).values(**values).returning(FeePayment.id)
+        ).scalar_one()
         db.session.commit()
 
-        return {"fee_payment": fee_payment.serialize()}, 201
+        return {"fee_payment": FeePayment(id=fee_payment_id, **values).serialize()}, 201
 
     def put(self, fee_payment_id):
-        fee_payment = FeePayment.query.get(fee_payment_id)
+        fee_payment = db.session.get(FeePayment, fee_payment_id)
         if not fee_payment:
             return {"message": "Fee payment not found"}, 404
 
         data = request.get_json()
+        old_amount = fee_payment.amount
         fee_payment.amount = data.get("amount", fee_payment.amount)
-        fee_payment.payment_date = datetime.strptime(
-            data.get("payment_date", fee_payment.payment_date.strftime("%Y-%m-%d")), "%Y-%m-%d"
-        )
+        if "payment_date" in data:
+            fee_payment.payment_date = parse_date(data["payment_date"])
         fee_payment.term = data.get("term", fee_payment.term)
         fee_payment.year = data.get("year", fee_payment.year)
         fee_payment.method = data.get("method", fee_payment.method)
+        with db.session.no_autoflush:  # Flush the field updates together with the new balance
+            student = self.add_to_total_paid(fee_payment.student_id, float(fee_payment.amount) - old_amount)
 
-        db.session.commit()
-
-        # Recalculate balance
-        student = fee_payment.student
+        # Recalculate balance and save it with the field updates in one commit
         try:
-            balance = self.calculate_balance(student, 0)  # No new payment, recalculate
+            fee_payment.balance = self.calculate_balance(student)
         except ValueError as e:
+            db.session.commit()  # The field updates are still saved, as before
             return {"message": str(e)}, 400
 
-        fee_payment.balance = balance
         db.session.commit()
 
         return {"message": "Fee payment updated", "fee_payment": fee_payment.serialize()}, 200
 
     def delete(self, fee_payment_id):
-        fee_payment = FeePayment.query.get(fee_payment_id)
-        if not fee_payment:
+        # DELETE ... RETURNING hands back the student and amount to take off without a prior SELECT
+        deleted = db.session.execute(
+            delete(FeePayment)
+            .where(FeePayment.id == fee_payment_id)
+            .returning(FeePayment.student_id, FeePayment.amount),
+            execution_options={"synchronize_session": False},
+        ).one_or_none()
+        if deleted is None:
             return {"message": "Fee payment not found"}, 404
-
-        student_id = fee_payment.student_id
-        db.session.delete(fee_payment)
+        student = self.add_to_total_paid(deleted.student_id, -deleted.amount)
         db.session.commit()
 
         # Recalculate balance after deletion
-        student = Student.query.get(student_id)
         try:
-            balance = self.calculate_balance(student, 0)  # No new payment, recalculate
+            balance = self.calculate_balance(student)
         except ValueError as e:
             return {"message": str(e)}, 400
 
@@ -1030,5 +1496,67 @@ class FeePaymentResource(Resource):
 
 api.add_resource(FeePaymentResource, "/fee-payment", "/fee-payment/<int:fee_payment_id>")
 
+
+class FeePaymentBulkResource(Resource):
+    def post(self):
+        """Record many fee payments from a JSON array in one batched INSERT and a single commit."""
+        try:
+            payments = fee_payments_decoder.decode(request.get_data())
+        except msgspec.DecodeError as e:
+            return {"message": str(e)}, 400
+
+        # One total_paid UPDATE per student rather than per payment
+        paid_per_student = Counter()
+        for payment in payments:
+            paid_per_student[payment.student_id] += payment.amount
+        students = {}
+        for student_id, paid in paid_per_student.items():
+            student = FeePaymentResource.add_to_total_paid(student_id, paid)
+            if not student:
+                db.session.rollback()
+                return {"message": f"Student {student_id} not found"}, 404
+            students[student_id] = student
+
+        # Each payment's balance is what was still owed right after it, as if posted one by one in order
+        try:
+            owed = {
+                student_id: FeePaymentResource.calculate_grand_total(student)
+                - (student.total_paid - paid_per_student[student_id])
+                for student_id, student in students.items()
+            }
+        except ValueError as e:
+            db.session.rollback()
+            return {"message": str(e)}, 400
+        records = []
+        for payment in payments:
+            owed[payment.student_id] -= payment.amount
+            records.append({**msgspec.structs.asdict(payment), "balance": owed[payment.student_id]})
+
+        try:
+            ids = FeePayment.bulk_create(records)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {"message": f"Error creating fee payments: {str(e)}"}, 400
+        return {
+            "message": f"{len(records)} fee payments created",
+            "fee_payments": [FeePayment(id=id_, **values).serialize() for id_, values in zip(ids, records)],
+        }, 201
+
+
+api.add_resource(FeePaymentBulkResource, "/fee-payment/bulk")
+
+
+class StudentFeePaymentsResource(Resource):
+    def get(self, student_id):
+        """Every fee payment of one student, newest first, read straight from result rows."""
+        fee_payments = repository.fee_payments_list(student_id)
+        if not fee_payments and db.session.scalar(select(Student.id).where(Student.id == student_id)) is None:
+            return {"message": "Student not found"}, 404
+        return {"student_id": student_id, "fee_payments": fee_payments}, 200
+
+
+api.add_resource(StudentFeePaymentsResource, "/students/<int:student_id>/fee-payments")
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
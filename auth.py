@@ -1,8 +1,33 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_restful import Resource
 from flask_login import login_user, logout_user, current_user, login_required
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 from models import User, db
 
+TOKEN_MAX_AGE = 12 * 60 * 60  # Seconds an access token stays valid
+
+
+def _token_serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="access-token")
+
+
+def issue_token(user):
+    """Sign the user's id, username and role into a bearer token."""
+    return _token_serializer().dumps({"id": user.id, "username": user.username, "role": user.role})
+
+
+def user_from_token(token):
+    """
+    Rebuild the user from a bearer token's signed claims, without querying the users table.
+    Returns None for a forged or expired token.
+    """
+    try:
+        claims = _token_serializer().loads(token, max_age=TOKEN_MAX_AGE)
+    except BadSignature:  # Also covers SignatureExpired
+        return None
+    return User(id=claims["id"], username=claims["username"], role=claims["role"])
+
+
 class Register(Resource):
     def post(self):
         data = request.get_json()
@@ -39,7 +64,7 @@ class Login(Resource):
             return {"message": "Invalid username or password."}, 401
 
         login_user(user)
-        return {"message": f"Welcome, {user.username}!"}, 200
+        return {"message": f"Welcome, {user.username}!", "access_token": issue_token(user)}, 200
 
 
 class Logout(Resource):
@@ -2,11 +2,65 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from sqlalchemy_serializer import SerializerMixin
 from datetime import datetime
+from collections import Counter, defaultdict
+from functools import lru_cache
+from operator import attrgetter
+import os
 from flask_bcrypt import Bcrypt
+from sqlalchemy import func, literal_column, event, select, insert, inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload, selectinload, raiseload, undefer_group
 
 bcrypt = Bcrypt()
 db = SQLAlchemy()
 
+# Loader strategy for the large one-to-many collections (Class.students, Subject.teachers,
+# Subject.score_grades). Set RAISE_ON_LAZY_LOAD=1 in development and testing so that touching one
+# without an explicit selectinload/joinedload raises instead of quietly issuing a query per parent.
+HEAVY_COLLECTION_LAZY = "raise_on_sql" if os.environ.get("RAISE_ON_LAZY_LOAD") else "select"
+
+
+def require_loaded(instance, *relationships):
+    """Raise instead of lazy loading when a "full" serializer is handed an instance without its relationships."""
+    unloaded = inspect(instance).unloaded.intersection(relationships)
+    if unloaded:
+        raise RuntimeError(f"{type(instance).__name__} needs {', '.join(sorted(unloaded))} eager-loaded")
+
+
+def loaded_dict(instance):
+    """
+    The instance's column values as a dict, for serializers that read them by key rather than through
+    the instrumented attribute descriptors. Normally this is just ``__dict__``. Columns missing from it
+    are fetched by attribute access, as ``instance.column`` would: expired ones (e.g. after a commit)
+    are reloaded in one SELECT, deferred ones lazy-load, and unset ones on a transient instance are None.
+    """
+    state = inspect(instance)
+    unloaded = state.unloaded
+    if unloaded:
+        missing = unloaded.intersection(state.mapper.column_attrs.keys())
+        if missing:
+            return {**instance.__dict__, **{key: getattr(instance, key) for key in missing}}
+    return instance.__dict__
+
+
+# Scalar payloads of the small, rarely-changing rows (classes, subjects, tests), memoized on the
+# column values themselves: an edited row produces a new key, so there is nothing to invalidate.
+# The dicts are shared between callers and must not be mutated; copy before adding keys.
+@lru_cache(maxsize=2048)
+def _class_dict(id_, class_name, teacher_id, student_count):
+    return {"id": id_, "class_name": class_name, "teacher_id": teacher_id, "student_count": student_count}
+
+
+@lru_cache(maxsize=2048)
+def _subject_dict(id_, subject_name, teacher_count, score_count):
+    return {"id": id_, "subject_name": subject_name, "teacher_count": teacher_count, "score_count": score_count}
+
+
+@lru_cache(maxsize=2048)
+def _test_dict(id_, name, term, year):
+    return {"id": id_, "name": name, "term": term, "year": year}
+
+
 #=================================================================================================
 # User Model
 #=================================================================================================
@@ -35,40 +89,76 @@ class User(db.Model, UserMixin, SerializerMixin):
 
 class Student(db.Model, SerializerMixin):
     __tablename__ = "students"
+    __table_args__ = (
+        db.Index("ix_student_class_id", "class_id"),
+        # Lookup by NEMIS number; partial, since most rows may not have one yet
+        db.Index(
+            "ix_student_nemis_no",
+            "nemis_no",
+            sqlite_where=text("nemis_no IS NOT NULL"),
+            postgresql_where=text("nemis_no IS NOT NULL"),
+        ),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     date_of_birth = db.Column(db.Date, nullable=False)
     gender = db.Column(db.String, nullable=False)
-    date_of_admission = db.Column(db.Date, nullable=False)
+    date_of_admission = db.Column(db.Date, nullable=False, index=True)
     class_id = db.Column(db.Integer, db.ForeignKey("classes.id"), nullable=False)
-    nemis_no = db.Column(db.Integer, nullable=True)
-    assessment_no = db.Column(db.Integer, nullable=True)
+    nemis_no = db.Column(db.BigInteger, nullable=True)  # Some NEMIS numbers exceed 32 bits
+    assessment_no = db.Column(db.BigInteger, nullable=True)
     pickup_location_id = db.Column(db.Integer, db.ForeignKey('pickup_locations.id'), nullable=True)
+    total_paid = db.Column(db.Float, nullable=False, default=0.0, server_default="0")  # Running sum of fee_payments.amount
 
     # Relationships
     student_class = db.relationship("Class", back_populates="students")
-    scores = db.relationship("ScoreGrade", back_populates="student", cascade="all, delete-orphan")
+    # serialize() emits scores by default, so fetch them for all loaded students in one IN query
+    scores = db.relationship("ScoreGrade", back_populates="student", cascade="all, delete-orphan", lazy="selectin")
     fee_payments = db.relationship("FeePayment", back_populates="student", cascade="all, delete-orphan")
     pickup_location = db.relationship('PickupLocation', backref='students')
 
-    def serialize(self):
-        return {
+    def serialize(self, include=("scores",)):
+        """Scalar columns plus the relationships named in ``include``; pass ``()`` to load nothing."""
+        data = {
             "id": self.id,
             "name": self.name,
-            "date_of_birth": self.date_of_birth.strftime("%Y-%m-%d") if self.date_of_birth else None,
+            "date_of_birth": self.date_of_birth,
             "gender": self.gender,
-            "date_of_admission": self.date_of_admission.strftime("%Y-%m-%d") if self.date_of_admission else None,
+            "date_of_admission": self.date_of_admission,
             "class_id": self.class_id,
             "nemis_no": self.nemis_no,
             "assessment_no": self.assessment_no,
             "pickup_location_id": self.pickup_location_id,
-            "scores": [score.serialize() for score in self.scores],
         }
+        if "scores" in include:
+            data["scores"] = [score.serialize() for score in self.scores]
+        return data
+
+    def serialize_shallow(self):
+        return self.serialize(include=())
+
+    @staticmethod
+    def rebuild_total_paid():
+        """Re-sum every student's fee payments into total_paid (for new or pre-existing databases)."""
+        students = Student.__table__
+        db.session.execute(
+            students.update().values(
+                total_paid=select(func.coalesce(func.sum(FeePayment.amount), 0))
+                .where(FeePayment.student_id == students.c.id)
+                .scalar_subquery()
+            )
+        )
 
     def __repr__(self):
         return f"<Student(id={self.id}, name={self.name})>"
 
 
+# Admission month as 'YYYY-MM'. Dates are stored as ISO text, so a prefix is enough, and the literal
+# arguments (not bound parameters) let SQLite match queries against the expression index below.
+admission_month = func.substr(Student.date_of_admission, literal_column("1"), literal_column("7"))
+db.Index("ix_students_admission_month", admission_month)
+
+
 #=================================================================================================
 # Teacher Model
 #=================================================================================================
@@ -82,21 +172,26 @@ class Teacher(db.Model, SerializerMixin):
     subject_id = db.Column(db.Integer, db.ForeignKey("subjects.id"), nullable=True)
 
     # Relationships
-    subject = db.relationship("Subject", back_populates="teachers")
-    classes = db.relationship("Class", back_populates="teacher", cascade="all, delete-orphan")
+    subject = db.relationship("Subject", back_populates="teachers", lazy="joined")
+    # serialize() always lists class_ids, so fetch them for all loaded teachers in one IN query
+    classes = db.relationship("Class", back_populates="teacher", cascade="all, delete-orphan", lazy="selectin")
 
     def serialize(self):
+        subject = None if self.subject_id is None else self.subject  # Skip the load for a NULL FK
         return {
             "id": self.id,
             "first_name": self.first_name,
             "last_name": self.last_name,
-            "date_of_admission": self.date_of_admission.strftime("%Y-%m-%d") if self.date_of_admission else None,
+            "date_of_admission": self.date_of_admission,
             "subject_id": self.subject_id,
-            "subject_name": self.subject.subject_name if self.subject else None,  # Avoid full serialize()
+            "subject_name": subject.subject_name if subject else None,  # Avoid full serialize()
             "class_ids": [class_.id for class_ in self.classes],  # Only IDs
         }
 
     def __repr__(self):
+        return f"<Teacher(id={self.id})>"
+
+    def debug_repr(self):
         return (
             f"<Teacher(id={self.id}, name={self.first_name} {self.last_name}, "
             f"subject_id={self.subject_id})>"
@@ -114,17 +209,53 @@ class Class(db.Model):
 
     # Relationships
     teacher = db.relationship("Teacher", back_populates="classes")
-    students = db.relationship("Student", back_populates="student_class", cascade="all, delete-orphan")
+    students = db.relationship(
+        "Student", back_populates="student_class", cascade="all, delete-orphan", lazy=HEAVY_COLLECTION_LAZY
+    )
     fee_structure = db.relationship("FeeStructure", back_populates="class_", uselist=False)
 
-    def serialize(self):
-        return {
-            "id": self.id,
-            "class_name": self.class_name,
-            "teacher_id": self.teacher_id,
-            "teacher": self.teacher.serialize() if self.teacher else None,
-            "students": [student.serialize() for student in self.students],
-        }
+    # Counted by SQL; deferred so classes loaded only as another row's relation skip the subquery
+    student_count = db.column_property(
+        select(func.count(Student.id)).where(Student.class_id == id).correlate_except(Student).scalar_subquery(),
+        deferred=True,
+        group="counts",
+    )
+
+    _COLUMNS = attrgetter("id", "class_name", "teacher_id", "student_count")  # One C call per instance
+
+    def serialize(self, include=()):
+        """
+        Scalar columns and the student count, plus the relationships named in ``include``
+        (``"teacher"``, ``"students"``; ``"students.scores"`` also nests each student's scores).
+        """
+        data = _class_dict(*self._COLUMNS(self))
+        if not include:
+            return data
+        data = dict(data)
+        if "teacher" in include:
+            teacher = None if self.teacher_id is None else self.teacher  # Skip the load for a NULL FK
+            data["teacher"] = teacher.serialize() if teacher else None
+        if "students" in include:
+            student_include = ("scores",) if "students.scores" in include else ()
+            data["students"] = [student.serialize(include=student_include) for student in self.students]
+        return data
+
+    def serialize_deep(self, include=("teacher", "students", "students.scores")):
+        """The class with its teacher and students (and their scores) nested."""
+        return self.serialize(include=include)
+
+    @classmethod
+    def get_with_children(cls, class_id):
+        """
+        Load one class with everything serialize_deep() reads, in a fixed four queries however many
+        students it has; any other relationship access raises instead of lazy loading.
+        """
+        return db.session.get(cls, class_id, options=[
+            undefer_group("counts"),
+            joinedload(cls.teacher).options(joinedload(Teacher.subject), selectinload(Teacher.classes)),
+            selectinload(cls.students).selectinload(Student.scores),
+            raiseload("*", sql_only=True),
+        ])
 
     def __repr__(self):
         return f"<Class(id={self.id}, class_name={self.class_name})>"
@@ -139,16 +270,108 @@ class Subject(db.Model):
     subject_name = db.Column(db.String, unique=True, nullable=False)
 
     # Relationships
-    teachers = db.relationship("Teacher", back_populates="subject", cascade="all, delete-orphan")
-    score_grades = db.relationship("ScoreGrade", back_populates="subject", cascade="all, delete-orphan")
-
-    def serialize(self):
-        return {
-            "id": self.id,
-            "subject_name": self.subject_name,
-            "teachers": [teacher.serialize() for teacher in self.teachers],
-            "score_grades": [score.serialize() for score in self.score_grades],
-        }
+    teachers = db.relationship(
+        "Teacher", back_populates="subject", cascade="all, delete-orphan", lazy=HEAVY_COLLECTION_LAZY
+    )
+    score_grades = db.relationship(
+        "ScoreGrade", back_populates="subject", cascade="all, delete-orphan", lazy=HEAVY_COLLECTION_LAZY
+    )
+
+    # Counted by SQL; deferred so subjects joined onto every teacher skip the subqueries
+    teacher_count = db.column_property(
+        select(func.count(Teacher.id)).where(Teacher.subject_id == id).correlate_except(Teacher).scalar_subquery(),
+        deferred=True,
+        group="counts",
+    )
+
+    _COLUMNS = attrgetter("id", "subject_name", "teacher_count", "score_count")
+
+    def serialize(self, include=()):
+        """
+        Scalar columns and the teacher and score counts, plus the relationships named in ``include``
+        (``"teachers"``, ``"score_grades"``).
+        """
+        data = _subject_dict(*self._COLUMNS(self))
+        if not include:
+            return data
+        data = dict(data)
+        if "teachers" in include:
+            data["teachers"] = [teacher.serialize() for teacher in self.teachers]
+        if "score_grades" in include:
+            data["score_grades"] = [score.serialize() for score in self.score_grades]
+        return data
+
+    @classmethod
+    def serialize_bulk(cls, subject_ids):
+        """
+        The subjects with their teachers and score grades nested (the shape of
+        ``serialize(include=("teachers", "score_grades"))``), from four flat SELECTs (subjects, their
+        teachers, those teachers' class ids, their scores). Children are grouped into per-subject
+        lists once, and each subject just picks up its list; no ORM objects or child serialize() calls.
+        """
+        subjects = db.session.execute(
+            select(cls.id, cls.subject_name).where(cls.id.in_(subject_ids)).order_by(cls.id)
+        ).all()
+        if not subjects:
+            return []
+        ids = [subject_id for subject_id, _ in subjects]
+        names = dict(subjects)
+
+        teacher_rows = db.session.execute(
+            select(Teacher.id, Teacher.first_name, Teacher.last_name, Teacher.date_of_admission, Teacher.subject_id)
+            .where(Teacher.subject_id.in_(ids))
+            .order_by(Teacher.id)
+        ).all()
+        class_ids_by_teacher = defaultdict(list)
+        if teacher_rows:
+            for class_id, teacher_id in db.session.execute(
+                select(Class.id, Class.teacher_id)
+                .where(Class.teacher_id.in_([row[0] for row in teacher_rows]))
+                .order_by(Class.id)
+            ):
+                class_ids_by_teacher[teacher_id].append(class_id)
+        teachers_by_subject = defaultdict(list)
+        for teacher_id, first_name, last_name, date_of_admission, subject_id in teacher_rows:
+            teachers_by_subject[subject_id].append({
+                "id": teacher_id,
+                "first_name": first_name,
+                "last_name": last_name,
+                "date_of_admission": date_of_admission,
+                "subject_id": subject_id,
+                "subject_name": names[subject_id],
+                "class_ids": class_ids_by_teacher[teacher_id],
+            })
+
+        scores_by_subject = defaultdict(list)
+        for row in db.session.execute(
+            select(
+                ScoreGrade.id,
+                ScoreGrade.student_id,
+                ScoreGrade.subject_id,
+                ScoreGrade.test_id,
+                ScoreGrade.score,
+                ScoreGrade.max_score,
+                ScoreGrade.term,
+                ScoreGrade.year,
+            )
+            .where(ScoreGrade.subject_id.in_(ids))
+            .order_by(ScoreGrade.id)
+        ).mappings():
+            scores_by_subject[row["subject_id"]].append(dict(row))
+
+        tree = []
+        for subject_id, subject_name in subjects:
+            teachers = teachers_by_subject.get(subject_id, [])
+            score_grades = scores_by_subject.get(subject_id, [])
+            tree.append({
+                "id": subject_id,
+                "subject_name": subject_name,
+                "teacher_count": len(teachers),
+                "score_count": len(score_grades),
+                "teachers": teachers,
+                "score_grades": score_grades,
+            })
+        return tree
 
     def __repr__(self):
         return f"<Subject(id={self.id}, subject_name={self.subject_name})>"
@@ -168,12 +391,8 @@ class Test(db.Model):
     score_grades = db.relationship("ScoreGrade", back_populates="test", cascade="all, delete-orphan")
 
     def serialize(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "term": self.term,
-            "year": self.year,
-        }
+        d = loaded_dict(self)
+        return _test_dict(d["id"], d["name"], d["term"], d["year"])
 
     def __repr__(self):
         return f"<Test(id={self.id}, name={self.name}, term={self.term}, year={self.year})>"
@@ -183,6 +402,10 @@ class Test(db.Model):
 #=================================================================================================
 class ScoreGrade(db.Model):
     __tablename__ = "score_grades"
+    __table_args__ = (
+        db.Index("ix_scoregrade_student_term_year", "student_id", "term", "year"),
+        db.Index("ix_scoregrade_subject_id", "subject_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey("students.id"), nullable=False)
@@ -199,18 +422,38 @@ class ScoreGrade(db.Model):
     test = db.relationship("Test", back_populates="score_grades")
 
     def serialize(self):
+        d = loaded_dict(self)
         return {
-            "id": self.id,
-            "student_id": self.student_id,
-            "subject_id": self.subject_id,
-            "test_id": self.test_id,
-            "score": self.score,
-            "max_score": self.max_score,
-            "term": self.term,
-            "year": self.year,
+            "id": d["id"],
+            "student_id": d["student_id"],
+            "subject_id": d["subject_id"],
+            "test_id": d["test_id"],
+            "score": d["score"],
+            "max_score": d["max_score"],
+            "term": d["term"],
+            "year": d["year"],
+        }
+
+    def serialize_full(self):
+        """serialize() plus the student and subject names; load both relationships eagerly first."""
+        # A NULL subject_id needs no subject loaded; check the FK before insisting on the relationship
+        if self.subject_id is None:
+            require_loaded(self, "student")
+            subject = None
+        else:
+            require_loaded(self, "student", "subject")
+            subject = self.subject
+        return {
+            **self.serialize(),
+            "student_name": self.student.name if self.student else None,
+            "subject_name": subject.subject_name if subject else None,
         }
 
     def __repr__(self):
+        return f"<ScoreGrade(id={self.id})>"
+
+    def debug_repr(self):
+        """Every column, for interactive debugging; __repr__ stays cheap for logs and error paths."""
         return (
             f"<ScoreGrade(id={self.id}, student_id={self.student_id}, subject_id={self.subject_id}, "
             f"test_id={self.test_id}, score={self.score}/{self.max_score}, "
@@ -218,8 +461,19 @@ class ScoreGrade(db.Model):
         )
 
 
+# Defined here because ScoreGrade comes after Subject; grouped with Subject.teacher_count
+Subject.score_count = db.column_property(
+    select(func.count(ScoreGrade.id)).where(ScoreGrade.subject_id == Subject.id).correlate_except(ScoreGrade).scalar_subquery(),
+    deferred=True,
+    group="counts",
+)
+
+
 class FeeStructure(db.Model, SerializerMixin): 
     __tablename__ = "fee_structures"
+    __table_args__ = (
+        db.Index("ix_fs_class_id_unique", "class_id", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), nullable=False)
@@ -229,34 +483,56 @@ class FeeStructure(db.Model, SerializerMixin):
     boarding_fee = db.Column(db.Float, nullable=True, default=0.0)
     prize_giving_fee = db.Column(db.Float, nullable=True, default=0.0)
     exam_fee = db.Column(db.Float, nullable=True, default=0.0)
-    total_fee = db.Column(db.Float, nullable=False, default=0.0)  # New column for total fee
+    total_fee = db.Column(db.Float, nullable=False, default=0.0)  # Kept in sync by sync_total_fee
+
+    FEE_FIELDS = ("tuition_fee", "books_fee", "miscellaneous_fee", "boarding_fee", "prize_giving_fee", "exam_fee")
+
+    @staticmethod
+    def total_of(fees):
+        """Sum individual fee amounts, counting None as 0."""
+        return sum(float(fee or 0.0) for fee in fees)
 
     # Relationships
-    class_ = db.relationship("Class", back_populates="fee_structure")
+    # serialize_with_class() always reads the class, so join it in whenever a structure is loaded
+    class_ = db.relationship("Class", back_populates="fee_structure", lazy="joined")
+
+    _COLUMNS = attrgetter("id", "class_id", "class_", *FEE_FIELDS, "total_fee")
 
     def serialize_with_class(self):
+        v = self._COLUMNS(self)
+        class_ = v[2]
         return {
-            "id": self.id,
-            "class_id": self.class_id,
+            "id": v[0],
+            "class_id": v[1],
             "class_details": {
-                "id": self.class_.id,
-                "class_name": self.class_.class_name
-            } if self.class_ else None,
-            "tuition_fee": self.tuition_fee,
-            "books_fee": self.books_fee,
-            "miscellaneous_fee": self.miscellaneous_fee,
-            "boarding_fee": self.boarding_fee,
-            "prize_giving_fee": self.prize_giving_fee,
-            "exam_fee": self.exam_fee,
-            "total_fee": self.total_fee,
+                "id": class_.id,
+                "class_name": class_.class_name
+            } if class_ else None,
+            "tuition_fee": v[3],
+            "books_fee": v[4],
+            "miscellaneous_fee": v[5],
+            "boarding_fee": v[6],
+            "prize_giving_fee": v[7],
+            "exam_fee": v[8],
+            "total_fee": v[9],
         }
 
     def __repr__(self):
+        return f"<FeeStructure(id={self.id})>"
+
+    def debug_repr(self):
         return (
             f"<FeeStructure(id={self.id}, class_id={self.class_id}, tuition_fee={self.tuition_fee}, "
             f"books_fee={self.books_fee}, miscellaneous_fee={self.miscellaneous_fee}, total_fee={self.total_fee})>"
         )
-    
+
+
+@event.listens_for(FeeStructure, "before_insert")
+@event.listens_for(FeeStructure, "before_update")
+def sync_total_fee(mapper, connection, fee_structure):
+    """Recompute total_fee from the individual fees whenever a fee structure is flushed."""
+    fee_structure.total_fee = FeeStructure.total_of(getattr(fee_structure, field) for field in FeeStructure.FEE_FIELDS)
+
 
 class PickupLocation(db.Model, SerializerMixin):
     __tablename__ = "pickup_locations"
@@ -281,6 +557,9 @@ class PickupLocation(db.Model, SerializerMixin):
 
 class FeePayment(db.Model, SerializerMixin):
     __tablename__ = "fee_payments"
+    __table_args__ = (
+        db.Index("ix_fp_student_term_year", "student_id", "year", "term"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey("students.id"), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -294,16 +573,162 @@ class FeePayment(db.Model, SerializerMixin):
     student = db.relationship("Student", back_populates="fee_payments")
 
     def serialize(self):
+        d = loaded_dict(self)
         return {
-            "id": self.id,
-            "student_id": self.student_id,
-            "amount": self.amount,
-            "payment_date": self.payment_date.strftime("%Y-%m-%d") if self.payment_date else None,
-            "term": self.term,
-            "year": self.year,
-            "method": self.method,
-            "balance": self.balance,
+            "id": d["id"],
+            "student_id": d["student_id"],
+            "amount": d["amount"],
+            "payment_date": d["payment_date"],
+            "term": d["term"],
+            "year": d["year"],
+            "method": d["method"],
+            "balance": d["balance"],
         }
 
+    @staticmethod
+    def bulk_create(records):
+        """
+        Insert many payments (dicts of column values) with one executemany INSERT ... RETURNING id,
+        skipping the ORM unit of work. Returns the new ids in the order of ``records``.
+        """
+        if not records:
+            return []
+        # RETURNING order is unspecified, but rowids are handed out in insert order within one
+        # statement, so sorting maps them back to the records (one multi-row VALUES, unlike
+        # sort_by_parameter_order, which SQLite can only honour row by row)
+        return sorted(db.session.scalars(insert(FeePayment).returning(FeePayment.id), records))
+
+    def serialize_full(self):
+        """serialize() plus the student's name; load the student relationship eagerly first."""
+        require_loaded(self, "student")
+        return {**self.serialize(), "student_name": self.student.name}
+
     def __repr__(self):
+        return f"<FeePayment(id={self.id})>"
+
+    def debug_repr(self):
         return f"<FeePayment(id={self.id}, student_id={self.student_id}, amount={self.amount})>"
+
+
+#=================================================================================================
+# Dashboard rollups
+#=================================================================================================
+def add_to_rollup(connection, key, deltas):
+    """
+    Add each ``{key_value: delta}`` to the ``count`` of the rollup table that ``key`` belongs to,
+    in one INSERT ... ON CONFLICT DO UPDATE that creates any missing rows.
+    """
+    if not deltas:
+        return
+    table = key.table
+    stmt = sqlite_insert(table)
+    connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={"count": table.c.count + stmt.excluded.count},
+        ),
+        [{key.name: value, "count": delta} for value, delta in deltas.items()],
+    )
+
+
+class MonthlyEnrollment(db.Model):
+    """Number of students admitted per 'YYYY-MM', kept current by the Student mapper events below."""
+    __tablename__ = "monthly_enrollment"
+
+    month = db.Column(db.String(7), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def adjust(connection, deltas):
+        """Add each ``{month: delta}`` to the rollup, creating missing months."""
+        add_to_rollup(connection, MonthlyEnrollment.__table__.c.month, deltas)
+
+    @staticmethod
+    def rebuild():
+        """Recount every month from the students table (for new or pre-existing databases)."""
+        db.session.execute(MonthlyEnrollment.__table__.delete())
+        db.session.execute(
+            MonthlyEnrollment.__table__.insert().from_select(
+                ["month", "count"],
+                select(admission_month, func.count()).group_by(admission_month),
+            )
+        )
+
+
+def month_of(day):
+    return day.isoformat()[:7]
+
+
+@event.listens_for(Student, "after_insert")
+def count_admission(mapper, connection, student):
+    MonthlyEnrollment.adjust(connection, {month_of(student.date_of_admission): 1})
+
+
+@event.listens_for(Student, "after_delete")
+def uncount_admission(mapper, connection, student):
+    MonthlyEnrollment.adjust(connection, {month_of(student.date_of_admission): -1})
+
+
+@event.listens_for(Student, "after_update")
+def move_admission(mapper, connection, student):
+    history = inspect(student).attrs.date_of_admission.history
+    if history.deleted and history.added:
+        old, new = month_of(history.deleted[0]), month_of(history.added[0])
+        if old != new:
+            MonthlyEnrollment.adjust(connection, {old: -1, new: 1})
+
+
+class SubjectScoreCount(db.Model):
+    """Number of score grades recorded per subject, kept current by the ScoreGrade mapper events below."""
+    __tablename__ = "subject_score_counts"
+
+    subject_id = db.Column(db.Integer, db.ForeignKey("subjects.id"), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def adjust(connection, deltas):
+        """Add each ``{subject_id: delta}`` to the rollup, creating missing subjects."""
+        add_to_rollup(connection, SubjectScoreCount.__table__.c.subject_id, deltas)
+
+    @staticmethod
+    def rebuild():
+        """Recount every subject from the score_grades table (for new or pre-existing databases)."""
+        db.session.execute(SubjectScoreCount.__table__.delete())
+        db.session.execute(
+            SubjectScoreCount.__table__.insert().from_select(
+                ["subject_id", "count"],
+                select(ScoreGrade.subject_id, func.count())
+                .where(ScoreGrade.subject_id.is_not(None))
+                .group_by(ScoreGrade.subject_id),
+            )
+        )
+
+
+@event.listens_for(ScoreGrade, "after_insert")
+def count_score(mapper, connection, score_grade):
+    if score_grade.subject_id is not None:
+        SubjectScoreCount.adjust(connection, {score_grade.subject_id: 1})
+
+
+@event.listens_for(ScoreGrade, "after_delete")
+def uncount_score(mapper, connection, score_grade):
+    if score_grade.subject_id is not None:
+        SubjectScoreCount.adjust(connection, {score_grade.subject_id: -1})
+
+
+@event.listens_for(Subject, "before_delete")
+def drop_subject_count(mapper, connection, subject):
+    connection.execute(SubjectScoreCount.__table__.delete().where(SubjectScoreCount.subject_id == subject.id))
+
+
+@event.listens_for(ScoreGrade, "after_update")
+def move_score(mapper, connection, score_grade):
+    history = inspect(score_grade).attrs.subject_id.history
+    if history.has_changes():
+        deltas = Counter()
+        for subject_id in history.deleted:
+            deltas[subject_id] -= 1
+        for subject_id in history.added:
+            deltas[subject_id] += 1
+        deltas.pop(None, None)
+        SubjectScoreCount.adjust(connection, {k: v for k, v in deltas.items() if v})
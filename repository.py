@@ -0,0 +1,47 @@
+"""Read-side queries that do their arithmetic in SQL and return plain dicts instead of ORM objects."""
+from sqlalchemy import func, select
+
+from models import db, Student, FeeStructure, FeePayment, PickupLocation
+
+
+def balances_for_class(class_id):
+    """
+    Fee balance of every student in a class in one SELECT: the class fee total plus the student's
+    transport fee, minus their running total paid. Empty if the class has no fee structure.
+    """
+    grand_total = FeeStructure.total_fee + func.coalesce(PickupLocation.transport_fee, 0.0)
+    rows = db.session.execute(
+        select(
+            Student.id,
+            Student.name,
+            grand_total.label("grand_total"),
+            Student.total_paid,
+            (grand_total - Student.total_paid).label("balance"),
+        )
+        .join(FeeStructure, FeeStructure.class_id == Student.class_id)
+        .outerjoin(PickupLocation, PickupLocation.id == Student.pickup_location_id)
+        .where(Student.class_id == class_id)
+        .order_by(Student.id)
+    )
+    return [
+        {
+            "student_id": student_id,
+            "student_name": name,
+            "grand_total": total,
+            "total_paid": total_paid,
+            "balance": balance,
+        }
+        for student_id, name, total, total_paid, balance in rows
+    ]
+
+
+def fee_payments_list(student_id):
+    """A student's fee payments, newest first, as plain row mappings; no ORM objects are built."""
+    return [
+        dict(row)
+        for row in db.session.execute(
+            select(*FeePayment.__table__.c)
+            .where(FeePayment.student_id == student_id)
+            .order_by(FeePayment.id.desc())
+        ).mappings()
+    ]
@@ -0,0 +1,33 @@
+"""Typed request bodies, decoded from JSON and validated in a single msgspec pass."""
+from datetime import date
+
+import msgspec
+
+
+class FeePaymentIn(msgspec.Struct):
+    student_id: int
+    amount: float
+    payment_date: date
+    term: str
+    year: int
+    method: str
+
+
+fee_payment_decoder = msgspec.json.Decoder(FeePaymentIn)
+fee_payments_decoder = msgspec.json.Decoder(list[FeePaymentIn])
+
+
+class ScoreGradeIn(msgspec.Struct):
+    student_id: int
+    subject_id: int
+    test_id: int | None = None
+    score: float | None = None
+    max_score: float | None = 100.0
+    term: str | None = None
+    year: int | None = None
+
+
+# Lax mode keeps accepting numeric strings such as "85", as the old reqparse parser did
+score_grade_decoder = msgspec.json.Decoder(ScoreGradeIn, strict=False)
+# POST /score_grades also takes a JSON array of score grades for batch imports
+score_grades_decoder = msgspec.json.Decoder(ScoreGradeIn | list[ScoreGradeIn], strict=False)
@@ -0,0 +1,101 @@
+"""Bulk serializers that build nested payloads from a few flat queries instead of walking ORM objects."""
+from collections import defaultdict
+
+from sqlalchemy import select
+
+from models import db, Class, Teacher, Subject, Student, ScoreGrade
+
+
+def build_class_tree(class_ids):
+    """
+    Build Class.serialize_deep() payloads for ``class_ids`` from four flat SELECTs (classes with their
+    teacher, the teachers' class ids, students, scores), stitched together by foreign key.
+    Rows come back as plain mappings, so no ORM objects are created.
+    """
+    class_rows = db.session.execute(
+        select(
+            Class.id,
+            Class.class_name,
+            Class.teacher_id,
+            Teacher.id.label("joined_teacher_id"),  # None when teacher_id points at no teacher
+            Teacher.first_name,
+            Teacher.last_name,
+            Teacher.date_of_admission,
+            Teacher.subject_id,
+            Subject.subject_name,
+        )
+        .outerjoin(Teacher, Class.teacher_id == Teacher.id)
+        .outerjoin(Subject, Teacher.subject_id == Subject.id)
+        .where(Class.id.in_(class_ids))
+        .order_by(Class.id)
+    ).mappings().all()
+    if not class_rows:
+        return []
+
+    class_ids_by_teacher = defaultdict(list)
+    teacher_ids = {row["joined_teacher_id"] for row in class_rows if row["joined_teacher_id"] is not None}
+    if teacher_ids:
+        for class_id, teacher_id in db.session.execute(
+            select(Class.id, Class.teacher_id).where(Class.teacher_id.in_(teacher_ids)).order_by(Class.id)
+        ):
+            class_ids_by_teacher[teacher_id].append(class_id)
+
+    students_by_class = defaultdict(list)
+    students_by_id = {}
+    for row in db.session.execute(
+        select(
+            Student.id,
+            Student.name,
+            Student.date_of_birth,
+            Student.gender,
+            Student.date_of_admission,
+            Student.class_id,
+            Student.nemis_no,
+            Student.assessment_no,
+            Student.pickup_location_id,
+        )
+        .where(Student.class_id.in_([row["id"] for row in class_rows]))
+        .order_by(Student.id)
+    ).mappings():
+        student = {**row, "scores": []}
+        students_by_class[row["class_id"]].append(student)
+        students_by_id[row["id"]] = student
+
+    if students_by_id:
+        for row in db.session.execute(
+            select(
+                ScoreGrade.id,
+                ScoreGrade.student_id,
+                ScoreGrade.subject_id,
+                ScoreGrade.test_id,
+                ScoreGrade.score,
+                ScoreGrade.max_score,
+                ScoreGrade.term,
+                ScoreGrade.year,
+            )
+            .where(ScoreGrade.student_id.in_(list(students_by_id)))
+            .order_by(ScoreGrade.id)
+        ).mappings():
+            students_by_id[row["student_id"]]["scores"].append(dict(row))
+
+    tree = []
+    for row in class_rows:
+        students = students_by_class[row["id"]]
+        teacher_id = row["joined_teacher_id"]
+        tree.append({
+            "id": row["id"],
+            "class_name": row["class_name"],
+            "teacher_id": row["teacher_id"],
+            "student_count": len(students),
+            "teacher": {
+                "id": teacher_id,
+                "first_name": row["first_name"],
+                "last_name": row["last_name"],
+                "date_of_admission": row["date_of_admission"],
+                "subject_id": row["subject_id"],
+                "subject_name": row["subject_name"],
+                "class_ids": class_ids_by_teacher[teacher_id],
+            } if teacher_id is not None else None,
+            "students": students,
+        })
+    return tree